@@ -0,0 +1,1210 @@
+"""Offline benchmarks for the Argonis threat intel collector.
+
+Every source URL of the collector is pointed at a local HTTP stand-in so the
+numbers can be reproduced without touching the real third-party services.
+
+    python argonisintel_benchmark.py fetch --latency 0.2 --workers 16
+"""
+import argparse
+import gc
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+def load_collector_module():
+    """Import argonisintel_v2.1.py, whose file name is not a valid module name"""
+    path = Path(__file__).with_name("argonisintel_v2.1.py")
+    spec = importlib.util.spec_from_file_location("argonisintel", path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process pool workers can unpickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# ----------------- STAND-IN SERVER -----------------
+
+def feed_format(url, feed_type):
+    """Body format a real source publishes, judged from its URL and feed type"""
+    url = url.lower()
+    if "tweetfeed" in url:
+        return "tweetfeed"
+    if "urlhaus.abuse.ch/downloads/csv" in url:
+        return "urlhaus_csv"
+    if "threatfox.abuse.ch/export/csv" in url:
+        return "threatfox_csv"
+    if "hostfile" in url:
+        return "hostfile"
+    if "hole.cert.pl" in url:
+        return "certpl_tsv"
+    if "blocklist_domain.csv" in url:
+        return "botvrij_csv"
+    if url.endswith(".netset"):
+        return "netset"
+    if url.endswith(".json"):
+        return "spamhaus_json"
+    if feed_type == "hashes":
+        return "hash_list"
+    if feed_type == "urls":
+        return "domain_list" if "domain" in url or "nrd" in url or "spam" in url else "url_list"
+    if ".csv" in url or "type=csv" in url:
+        return "ip_csv"
+    if "ipsum" in url:
+        return "ipsum"
+    return "ip_list"
+
+
+def synthetic_feed(fmt, seed, count):
+    """Deterministic feed body of count records in one of the real source formats"""
+    rng = random.Random(seed)
+
+    def ip():
+        return ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+
+    def domain():
+        return f"host{rng.randrange(10**6)}.example"
+
+    def url():
+        return f"http://{domain()}/{rng.randrange(10**6)}/payload.bin"
+
+    def digest():
+        return "%0*x" % (rng.choice((32, 40, 64)), rng.getrandbits(256))
+
+    stamp = "2024-05-01 10:00:00"
+    if fmt == "tweetfeed":
+        kinds = (("ip", ip), ("url", url), ("domain", domain), ("sha256", digest))
+        lines = []
+        for _ in range(count):
+            kind, make = rng.choice(kinds)
+            lines.append(f"{stamp},analyst{rng.randrange(100)},{kind},{make()},#malware,"
+                         f"https://twitter.com/analyst/status/{rng.randrange(10**12)}")
+    elif fmt == "urlhaus_csv":
+        lines = ['# id,dateadded,url,url_status,last_online,threat,tags,urlhaus_link,reporter']
+        lines += [f'"{rng.randrange(10**7)}","{stamp}","{url()}","online","{stamp}","malware_download",'
+                  f'"elf","https://urlhaus.abuse.ch/url/{rng.randrange(10**7)}/","reporter"'
+                  for _ in range(count)]
+    elif fmt == "threatfox_csv":
+        make = digest if ("md5" in seed or "sha256" in seed) else url
+        lines = ['# "first_seen_utc","ioc_id","ioc_value","ioc_type","threat_type","fk_malware"']
+        lines += [f'"{stamp}","{rng.randrange(10**7)}","{make()}","ioc","payload","win.agent"'
+                  for _ in range(count)]
+    elif fmt == "hostfile":
+        lines = ["# ThreatFox hostfile", "127.0.0.1 localhost"]
+        lines += [f"127.0.0.1 {domain()}" for _ in range(count)]
+    elif fmt == "certpl_tsv":
+        lines = ["RegisterPositionId\tDomainAddress\tInsertDate"]
+        lines += [f"{rng.randrange(10**6)}\t{domain()}\t{stamp}" for _ in range(count)]
+    elif fmt == "botvrij_csv":
+        lines = [f"{domain()},phishing {rng.randrange(1000)}" for _ in range(count)]
+    elif fmt == "netset":
+        lines = ["#", "# firehol_level1", "#"]
+        lines += [f"{ip()}/{rng.randrange(16, 33)}" if rng.randrange(3) == 0 else ip() for _ in range(count)]
+    elif fmt == "spamhaus_json":
+        lines = [f'{{"cidr":"{ip()}/{rng.randrange(16, 25)}","sblid":"SBL{rng.randrange(10**6)}","rir":"ripencc"}}'
+                 for _ in range(count)]
+        lines.append(f'{{"type":"metadata","timestamp":{rng.randrange(10**9)},"size":{count}}}')
+    elif fmt == "hash_list":
+        lines = ["# hashes"] + [digest() for _ in range(count)]
+    elif fmt == "domain_list":
+        lines = ["# domains"] + [domain() for _ in range(count)]
+    elif fmt == "url_list":
+        lines = [url() for _ in range(count)]
+    elif fmt == "ip_csv":
+        lines = ["ip,port,first_seen"] + [f"{ip()},{rng.randrange(1, 65536)},{stamp}" for _ in range(count)]
+    elif fmt == "ipsum":
+        lines = ["# IPsum Threat Intelligence Feed"] + [f"{ip()}\t{rng.randrange(1, 9)}" for _ in range(count)]
+    else:
+        lines = ["# ip list"] + [ip() for _ in range(count)]
+    return "\n".join(lines) + "\n"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Runs once per connection: stands in for the TCP+TLS handshake of a real host
+        self.server.connected()
+        time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = server.body(self.path)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        if server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = server.compressed(self.path)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if not server.drip_bytes:
+            self.wfile.write(body)
+            return
+        # Slow-drip: the body trickles in, as from an overloaded source
+        for offset in range(0, len(body), server.drip_bytes):
+            self.wfile.write(body[offset:offset + server.drip_bytes])
+            self.wfile.flush()
+            time.sleep(server.drip_interval)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInCluster:
+    """One local HTTP server per real host, so per-host limits still apply
+
+    Every source path is served a synthetic body in the format its real
+    counterpart publishes. error_rate answers that share of requests with
+    503, and drip_bytes/drip_interval send bodies a few bytes at a time.
+    handshake delays every new connection, compress gzips bodies for
+    clients that accept it; connections counts the connections accepted.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.05, lines_per_feed=200, error_rate=0.0,
+                 drip_bytes=0, drip_interval=0.01, handshake=0.0, compress=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.lines_per_feed = lines_per_feed
+        self.error_rate = error_rate
+        self.drip_bytes = drip_bytes
+        self.drip_interval = drip_interval
+        self.handshake = handshake
+        self.compress = compress
+        self.connections = 0
+        self.formats = {}
+        self.servers = {}
+        self._bodies = {}
+        self._compressed = {}
+        self._lock = threading.Lock()
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def body(self, path):
+        """Encoded body of a source path, generated once"""
+        with self._lock:
+            body = self._bodies.get(path)
+            if body is None:
+                fmt = self.formats.get(path, "ip_list")
+                body = synthetic_feed(fmt, path, self.lines_per_feed).encode("utf-8")
+                self._bodies[path] = body
+            return body
+
+    def compressed(self, path):
+        """Gzipped body of a source path"""
+        body = self.body(path)
+        with self._lock:
+            if path not in self._compressed:
+                self._compressed[path] = gzip.compress(body, mtime=0)
+            return self._compressed[path]
+
+    def local_url(self, url, feed_type=None):
+        """Map a real source URL onto the stand-in server for its host"""
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        server = self.servers.get(host)
+        if server is None:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+            server.daemon_threads = True
+            for setting in ("latency", "jitter", "error_rate", "drip_bytes", "drip_interval",
+                            "handshake", "compress"):
+                setattr(server, setting, getattr(self, setting))
+            server.body = self.body
+            server.compressed = self.compressed
+            server.connected = self.connected
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers[host] = server
+        path = f"/{host}{parts.path or '/'}"
+        if parts.query:
+            path += "?" + parts.query
+        self.formats.setdefault(path, feed_format(url, feed_type))
+        return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+    def redirect(self, collector):
+        """Point a collector's source table at the stand-in servers"""
+        collector.c2_feeds = {
+            name: self.local_url(url, "c2") for name, url in collector.c2_feeds.items()
+        }
+        collector.base_feeds = {
+            feed_type: [self.local_url(url, feed_type) for url in urls]
+            for feed_type, urls in collector.base_feeds.items()
+        }
+        collector.source_hints = {
+            self.local_url(url): hint for url, hint in collector.source_hints.items()
+        }
+        return collector
+
+    def close(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+class LargeFeedHandler(BaseHTTPRequestHandler):
+    """Streams a synthetic IP list of server.size bytes without holding it in memory"""
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        pool = self.server.pool
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        # The body ends when the connection closes, so no Content-Length is needed
+        remaining = self.server.size
+        while remaining > 0:
+            block = pool[:remaining]
+            self.wfile.write(block)
+            remaining -= len(block)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_large_feed_server(size, distinct):
+    """Serve size bytes of IP lines drawn from a pool of distinct addresses"""
+    rng = random.Random(size)
+    lines = [".".join(str(rng.randrange(1, 255)) for _ in range(4)) for _ in range(distinct)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LargeFeedHandler)
+    server.daemon_threads = True
+    server.size = size
+    server.pool = ("\n".join(lines) + "\n").encode("utf-8")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def read_feed_bodies(directory):
+    """Feed files without the Generated timestamp line, for byte comparisons"""
+    bodies = {}
+    for path in sorted(Path(directory).glob("argonisintel_*_Feed.txt")):
+        lines = path.read_bytes().splitlines(keepends=True)
+        bodies[path.name] = b"".join(l for l in lines if not l.startswith(b"# Generated:"))
+    return bodies
+
+
+# ----------------- BENCHMARKS -----------------
+
+def bench_fetch(args):
+    """Serial vs concurrent wall-clock time of a full collection run"""
+    module = load_collector_module()
+    cluster = StandInCluster(args.latency, args.jitter, args.lines)
+    runs = [("serial", 1, 1), ("concurrent", args.workers, args.per_host)]
+    timings, outputs = {}, {}
+    try:
+        for label, workers, per_host in runs:
+            collector = cluster.redirect(module.ThreatIntelCollector(
+                max_workers=workers, per_host_limit=per_host, cache_dir=None
+            ))
+            with tempfile.TemporaryDirectory() as out_dir:
+                collector.data_dir = Path(out_dir)
+                start = time.perf_counter()
+                collector.generate_feeds()
+                timings[label] = time.perf_counter() - start
+                outputs[label] = read_feed_bodies(out_dir)
+    finally:
+        cluster.close()
+
+    sources = sum(len(urls) for urls in module.ThreatIntelCollector().base_feeds.values())
+    sources += len(module.ThreatIntelCollector().c2_feeds)
+    print(f"\n{sources} sources, {len(cluster.servers)} hosts, "
+          f"{args.latency:.2f}s latency (+{args.jitter:.2f}s jitter)")
+    for label, workers, per_host in runs:
+        print(f"  {label:<11} workers={workers:<3} per-host={per_host:<3} {timings[label]:8.2f}s")
+    print(f"  speedup: {timings['serial'] / timings['concurrent']:.1f}x")
+    identical = outputs["serial"] == outputs["concurrent"]
+    print(f"  feed files identical: {'yes' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+def bench_cache(args):
+    """Cold run vs a second run revalidated against the response cache"""
+    module = load_collector_module()
+    cluster = StandInCluster(args.latency, 0.0, args.lines)
+    timings, outputs = {}, {}
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for label in ("cold", "revalidated"):
+                collector = cluster.redirect(module.ThreatIntelCollector(cache_dir=cache_dir,
+                                                                         adaptive_refresh=False))
+                with tempfile.TemporaryDirectory() as out_dir:
+                    collector.data_dir = Path(out_dir)
+                    start = time.perf_counter()
+                    collector.generate_feeds()
+                    timings[label] = time.perf_counter() - start
+                    outputs[label] = read_feed_bodies(out_dir)
+                stats = collector.cache_stats
+                print(f"  {label:<12} {timings[label]:6.2f}s  downloaded={stats['fetched']:<4} "
+                      f"from cache={stats['cached']:<4} saved={module.format_bytes(stats['bytes_saved'])}")
+    finally:
+        cluster.close()
+    identical = outputs["cold"] == outputs["revalidated"]
+    print(f"  feed files identical: {'yes' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+def bench_session(args):
+    """Connections, handshake time and wire bytes: a fresh requests.get per source vs pooled sessions"""
+    module = load_collector_module()
+    cluster = StandInCluster(args.latency, 0.0, args.lines, handshake=args.handshake, compress=True)
+    results, outputs = {}, {}
+    try:
+        for label in ("requests.get", "pooled"):
+            collector = cluster.redirect(module.ThreatIntelCollector(
+                max_workers=args.workers, per_host_limit=args.per_host, cache_dir=None
+            ))
+            if label == "requests.get":
+                # What every fetch did before: a throwaway session and connection per URL
+                collector._session = lambda: module.requests
+            connections = cluster.connections
+            with tempfile.TemporaryDirectory() as out_dir:
+                collector.data_dir = Path(out_dir)
+                start = time.perf_counter()
+                collector.generate_feeds()
+                elapsed = time.perf_counter() - start
+                outputs[label] = read_feed_bodies(out_dir)
+            results[label] = (elapsed, cluster.connections - connections, collector.http_stats())
+    finally:
+        cluster.close()
+
+    print(f"\n{len(cluster.servers)} hosts, {args.handshake:.3f}s per handshake, "
+          f"{args.latency:.2f}s per request, gzip bodies")
+    print(f"  {'':<13} {'wall s':>7} {'requests':>9} {'connections':>12} {'handshake s':>12} "
+          f"{'wire':>10} {'bodies':>10}")
+    for label, (elapsed, connections, http) in results.items():
+        # The bare run bypasses the timed pools, so only the pooled one measures handshakes
+        handshake = f"{http['handshake_seconds']:.2f}" if label == "pooled" else "-"
+        print(f"  {label:<13} {elapsed:7.2f} {http['requests']:9} {connections:12} {handshake:>12} "
+              f"{module.format_bytes(http['wire_bytes']):>10} {module.format_bytes(http['body_bytes']):>10}")
+    print("  (handshake s is the client's connect time; the injected setup delay shows up as wait time)")
+    identical = outputs["requests.get"] == outputs["pooled"]
+    print(f"  feed files identical: {'yes' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+def bench_schedule(args):
+    """Simulated hourly runs: fetches, bytes and staleness with and without the learned schedule"""
+    module = load_collector_module()
+    rng = random.Random(19)
+    # Change period in hours and body size per source, shaped like the real table:
+    # a few constantly moving exports, many daily lists, some weekly ones
+    sources = []
+    for index in range(args.sources):
+        period = rng.choices((1, 6, 24, 168), weights=(15, 15, 50, 20))[0]
+        sources.append((f"source-{index}", period, rng.randrange(10**4, 10**7), rng.randrange(period)))
+
+    hours = args.days * 24
+    print(f"{args.sources} sources over {args.days} days of hourly runs")
+    print(f"  {'mode':<10} {'fetches':>8} {'traffic':>10} {'avg staleness':>14} {'max staleness':>14}")
+    for mode in ("refresh-all", "adaptive"):
+        schedule = module.RefreshSchedule() if mode == "adaptive" else None
+        fetches = traffic = 0
+        stale_hours = []
+        seen_version = {}
+        for hour in range(hours):
+            now = hour * 3600
+            for name, period, size, offset in sources:
+                version = (hour + offset) // period
+                if schedule is None or schedule.is_due(name, now):
+                    fetches += 1
+                    traffic += size
+                    seen_version[name] = (version, hour)
+                    if schedule is not None:
+                        schedule.observe(name, str(version), now)
+                # Hours since the source changed without the change being picked up
+                held, fetched_at = seen_version[name]
+                if held != version:
+                    changed_at = (version * period) - offset
+                    stale_hours.append(hour - changed_at)
+                else:
+                    stale_hours.append(0)
+        print(f"  {mode:<10} {fetches:>8} {module.format_bytes(traffic):>10} "
+              f"{sum(stale_hours) / len(stale_hours):>13.2f}h {max(stale_hours):>13}h")
+    return 0
+
+
+def bench_memory(args):
+    """Peak RSS of fetching and parsing one large feed, streamed vs fully buffered"""
+    print(f"{'feed size':>10} {'mode':<10} {'peak RSS':>10} {'time':>8} {'IPs':>9}")
+    for size_mb in args.sizes:
+        server = start_large_feed_server(size_mb * 1024 * 1024, args.distinct)
+        url = f"http://127.0.0.1:{server.server_address[1]}/nrd-list-32-days.txt"
+        try:
+            for mode in ("streaming", "buffered"):
+                # A fresh interpreter per run so ru_maxrss only reflects that run
+                output = subprocess.run(
+                    [sys.executable, __file__, "memory-probe", url, "--mode", mode],
+                    check=True, capture_output=True, text=True
+                ).stdout.split()
+                peak_kb, elapsed, count = int(output[-3]), float(output[-2]), int(output[-1])
+                print(f"{size_mb:>7} MB {mode:<10} {peak_kb / 1024:>7.1f} MB {elapsed:>7.2f}s {count:>9}")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+def memory_probe(args):
+    """Child process of the memory benchmark: collect one feed, print peak RSS"""
+    start = time.perf_counter()
+    if args.mode == "buffered":
+        # The pre-streaming path: whole body as one string, one list, then a set
+        import requests
+        lines = requests.get(args.url, timeout=300).text.splitlines()
+        ips = {line.strip() for line in lines if line and not line.startswith('#')}
+        count = len(ips)
+    else:
+        module = load_collector_module()
+        collector = module.ThreatIntelCollector(cache_dir=None)
+        collector.c2_feeds = {}
+        collector.base_feeds = {"ips": [args.url]}
+        count = len(collector.collect_feeds()["ips"])
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(peak_kb, f"{elapsed:.3f}", count)
+    return 0
+
+
+def bench_spill(args):
+    """Peak RSS and time of writing the feeds in memory vs with spilled sorted runs"""
+    print(f"{'indicators':>11} {'mode':<16} {'peak RSS':>10} {'time':>8}  output")
+    status = 0
+    for count in args.counts:
+        digests = {}
+        for threshold in (0, args.threshold):
+            mode = f"spill {threshold}" if threshold else "in memory"
+            # A fresh interpreter per run so ru_maxrss only reflects that run
+            result = json.loads(subprocess.run(
+                [sys.executable, __file__, "spill-probe", str(count), "--threshold", str(threshold)],
+                check=True, capture_output=True, text=True
+            ).stdout.splitlines()[-1])
+            digests[mode] = result["digest"]
+            same = "" if len(digests) == 1 else \
+                ("identical" if len(set(digests.values())) == 1 else "DIFFERENT")
+            print(f"{count:>11} {mode:<16} {result['peak_rss_mb']:>7.1f} MB {result['seconds']:>7.2f}s  {same}")
+        if len(set(digests.values())) > 1:
+            status = 1
+    return status
+
+
+def spill_probe(args):
+    """Child process of the spill benchmark: write every output file from synthetic stores"""
+    module = load_collector_module()
+    collector = module.ThreatIntelCollector(cache_dir=None, metrics_dir=None,
+                                            spill_threshold=args.threshold or None)
+    sources = 40
+    collector.sources = [(f"source-{index}", f"http://127.0.0.1/{index}") for index in range(sources)]
+
+    def collect_feeds():
+        # Overlapping synthetic batches in the shape parse_source yields: 45% IPs
+        # and CIDRs, 40% URLs and domains, 15% hashes
+        rng = random.Random(23)
+        all_data = collector.new_stores()
+        batch = 10000
+        for start in range(0, args.count, batch):
+            source = rng.randrange(sources)
+            ips, urls, hashes = set(), set(), set()
+            for _ in range(min(batch, args.count - start)):
+                kind = rng.random()
+                value = rng.randrange(args.count * 2)
+                if kind < 0.45:
+                    ips.add(f"{value >> 16 & 255 | 1}.{value >> 8 & 255}.{value & 255}.{rng.randrange(256)}"
+                            + ("/24" if value % 50 == 0 else ""))
+                elif kind < 0.85:
+                    urls.add(f"http://host{value}.example/path" if value % 3 else f"d{value}.example")
+                else:
+                    hashes.add(hashlib.sha256(str(value).encode()).hexdigest())
+            all_data["ips"].update(ips, source)
+            all_data["urls"].update(urls, 1 << source)
+            all_data["hashes"].update(hashes, 1 << source)
+        return all_data
+
+    collector.collect_feeds = collect_feeds
+    with tempfile.TemporaryDirectory() as out_dir:
+        collector.data_dir = Path(out_dir)
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            stats = collector.generate_feeds()
+        finally:
+            sys.stdout = stdout
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        digest = output_digest(out_dir)
+    print(json.dumps({"seconds": stats["seconds"], "peak_rss_mb": peak_kb / 1024, "digest": digest}))
+    return 0
+
+
+def output_digest(directory):
+    """SHA-256 of every output file line by line, feeds without their timestamp line"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(directory).glob("argonisintel_*")):
+        digest.update(path.name.encode())
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.startswith(b"# Generated:"):
+                    digest.update(line)
+    return digest.hexdigest()
+
+
+def bench_spill_check(args):
+    """Stores whose spills leave one run and nothing pending must write the same feeds as in memory"""
+    module = load_collector_module()
+    batches = [
+        # Exactly spill_limit entries per store: each spills once and keeps nothing in memory
+        {"ips": ["192.0.2.1", "192.0.2.2", "192.0.2.3"], "urls": ["http://a.example/", "b.example", "c.example"],
+         "hashes": [hashlib.sha256(bytes([n])).hexdigest() for n in range(3)]},
+        # IPv6 spilled after IPv4: one run per family from different spills
+        {"ips": ["2001:db8::1", "2001:db8::2", "2001:db8::3"], "urls": [], "hashes": []}
+    ]
+    results = {}
+    for label, threshold in (("in memory", None), ("spilled", 3)):
+        collector = module.ThreatIntelCollector(cache_dir=None, metrics_dir=None, spill_threshold=threshold)
+        collector.sources = [("source-0", "http://127.0.0.1/0")]
+
+        def collect_feeds(collector=collector):
+            all_data = collector.new_stores()
+            for batch in batches:
+                all_data["ips"].update(batch["ips"], 0)
+                all_data["urls"].update(set(batch["urls"]), 1)
+                all_data["hashes"].update(set(batch["hashes"]), 1)
+            return all_data
+
+        collector.collect_feeds = collect_feeds
+        with tempfile.TemporaryDirectory() as out_dir:
+            collector.data_dir = Path(out_dir)
+            stdout = sys.stdout
+            sys.stdout = io.StringIO()
+            try:
+                stats = collector.generate_feeds()
+            finally:
+                sys.stdout = stdout
+            headers = {path.name: [line for line in path.read_text().splitlines() if line.startswith("# Total")]
+                       for path in Path(out_dir).glob("argonisintel_*_Feed.txt")}
+            results[label] = ({feed: stats[feed] for feed in ("ips", "urls", "hashes")}, headers,
+                              output_digest(out_dir))
+        counts, headers, _ = results[label]
+        print(f"  {label:<10} counts={counts}  headers={sorted(line for lines in headers.values() for line in lines)}")
+    expected = {"ips": 6, "urls": 3, "hashes": 3}
+    ok = results["spilled"] == results["in memory"] and results["spilled"][0] == expected
+    print(f"  counts, headers and output identical: {'yes' if ok else 'NO'}")
+    return 0 if ok else 1
+
+
+SUITE_SCENARIOS = ("baseline", "latency", "errors", "slow-drip")
+
+
+def git_label():
+    """Short description of the checked-out version, for labelling results"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=Path(__file__).parent,
+                              check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_suite(args):
+    """End-to-end runtime, peak memory and indicators/s under each stand-in scenario"""
+    module = load_collector_module()
+    settings = {
+        "baseline": {},
+        "latency": {"latency": args.latency, "jitter": args.jitter},
+        "errors": {"error_rate": args.error_rate},
+        "slow-drip": {"drip_bytes": args.drip_bytes, "drip_interval": args.drip_interval}
+    }
+    results = {"label": args.label or git_label(), "lines_per_feed": args.lines, "scenarios": {}}
+    print(f"{results['label']}: {args.lines} lines per feed")
+    print(f"  {'scenario':<10} {'runtime':>8} {'peak RSS':>10} {'indicators/s':>13} "
+          f"{'ips':>8} {'urls':>8} {'hashes':>8} {'failed':>6}")
+    for scenario in args.scenarios:
+        options = dict({"latency": 0.0, "jitter": 0.0}, **settings[scenario])
+        cluster = StandInCluster(lines_per_feed=args.lines, **options)
+        try:
+            collector = cluster.redirect(module.ThreatIntelCollector(cache_dir=None))
+            with tempfile.TemporaryDirectory() as tmp:
+                table = Path(tmp) / "sources.json"
+                table.write_text(json.dumps({
+                    "c2_feeds": collector.c2_feeds,
+                    "base_feeds": collector.base_feeds,
+                    "source_hints": collector.source_hints
+                }))
+                # A fresh interpreter per scenario so ru_maxrss only reflects that run
+                output = subprocess.run(
+                    [sys.executable, __file__, "suite-probe", str(table), "--workers", str(args.workers)],
+                    check=True, capture_output=True, text=True
+                ).stdout.splitlines()[-1]
+        finally:
+            cluster.close()
+        run = json.loads(output)
+        results["scenarios"][scenario] = run
+        failed = sum(count for status, count in run["statuses"].items() if status in ("error", "empty"))
+        print(f"  {scenario:<10} {run['seconds']:>7.2f}s {run['peak_rss_mb']:>7.1f} MB "
+              f"{run['indicators'] / run['seconds']:>13,.0f} {run['feeds']['ips']:>8} "
+              f"{run['feeds']['urls']:>8} {run['feeds']['hashes']:>8} {failed:>6}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print(f"\ncompared with {previous['label']} (ratio, lower is better)")
+        for scenario, run in results["scenarios"].items():
+            before = previous["scenarios"].get(scenario)
+            if before is None:
+                continue
+            print(f"  {scenario:<10} runtime {run['seconds'] / before['seconds']:>5.2f}x  "
+                  f"peak RSS {run['peak_rss_mb'] / before['peak_rss_mb']:>5.2f}x")
+    return 0
+
+
+def suite_probe(args):
+    """Child process of the suite: one full run against a redirected source table"""
+    module = load_collector_module()
+    table = json.loads(Path(args.table).read_text())
+    collector = module.ThreatIntelCollector(max_workers=args.workers, cache_dir=None)
+    collector.c2_feeds = table["c2_feeds"]
+    collector.base_feeds = table["base_feeds"]
+    collector.source_hints = table["source_hints"]
+    with tempfile.TemporaryDirectory() as out_dir:
+        collector.data_dir = Path(out_dir)
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            stats = collector.generate_feeds()
+        finally:
+            sys.stdout = stdout
+    statuses = {}
+    for source in collector.source_report():
+        statuses[source["status"]] = statuses.get(source["status"], 0) + 1
+    print(json.dumps({
+        "seconds": stats["seconds"],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "indicators": collector.parse_stats["indicators"],
+        "lines": collector.parse_stats["lines"],
+        "feeds": {feed: stats[feed] for feed in ("ips", "urls", "hashes")},
+        "phases": collector.phase_seconds,
+        "statuses": statuses
+    }))
+    return 0
+
+
+def synthetic_mixed_lines(count, seed=7):
+    """Lines in the shapes real sources publish: bare lists, CSV rows, JSON, hostfiles"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        ip = ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+        domain = f"host{rng.randrange(10**6)}.example.com"
+        sha256 = "%064x" % rng.getrandbits(256)
+        shape = rng.randrange(6)
+        if shape == 0:
+            lines.append(ip)
+        elif shape == 1:
+            lines.append(f"{ip}\t{rng.randrange(1, 9)}")
+        elif shape == 2:
+            lines.append(f"2024-05-01 10:00:00,analyst,url,http://{domain}/{rng.randrange(10**4)},#phishing,"
+                         f"https://twitter.com/x/status/{rng.randrange(10**12)}")
+        elif shape == 3:
+            lines.append(f'{{"cidr":"{ip}/24","sblid":"SBL{rng.randrange(10**6)}","rir":"ripencc"}}')
+        elif shape == 4:
+            lines.append(f"0.0.0.0 {domain}")
+        else:
+            lines.append(f'"2024-05-01","{rng.randrange(10**6)}","{sha256}","sha256_hash","payload"')
+    return lines
+
+
+def bench_classify(args):
+    """Classifier throughput vs the old raw-line and split/isdigit paths"""
+    module = load_collector_module()
+    lines = synthetic_mixed_lines(args.lines)
+    batch_size = 10000
+
+    # Old base-feed path: every stripped line goes in as-is
+    start = time.perf_counter()
+    legacy = set()
+    for line in lines:
+        if line and not line.startswith('#'):
+            legacy.add(line.strip())
+    raw_seconds = time.perf_counter() - start
+
+    # Old C2 path: split on commas, isdigit/int() per octet
+    start = time.perf_counter()
+    for line in lines:
+        parts = line.strip().split(',')
+        if len(parts) >= 2 and parts[1]:
+            ip = parts[1].strip()
+            all(x.isdigit() and 0 <= int(x) <= 255 for x in ip.split('.'))
+    split_seconds = time.perf_counter() - start
+
+    classifier = module.IndicatorClassifier()
+    found = {"ips": set(), "urls": set(), "hashes": set()}
+    start = time.perf_counter()
+    for offset in range(0, len(lines), batch_size):
+        batch_found, _ = classifier.classify(lines[offset:offset + batch_size])
+        for feed_type, indicators in batch_found.items():
+            found[feed_type].update(indicators)
+    classify_seconds = time.perf_counter() - start
+
+    # One-indicator-per-line bodies (NRD, FireHOL) take the classifier's bare-block path
+    bare = [line.split("\t")[0] for line in lines if "," not in line and " " not in line and "{" not in line]
+    start = time.perf_counter()
+    for offset in range(0, len(bare), batch_size):
+        classifier.classify(bare[offset:offset + batch_size])
+    bare_seconds = time.perf_counter() - start
+
+    dirty = sum(1 for value in legacy if any(c in value for c in ",\t {"))
+    print(f"{len(lines)} synthetic lines")
+    print(f"  raw lines (old base path)  {len(lines) / raw_seconds:>12,.0f} lines/s  "
+          f"{dirty} of {len(legacy)} entries are whole rows")
+    print(f"  split/isdigit (old C2)     {len(lines) / split_seconds:>12,.0f} lines/s")
+    print(f"  IndicatorClassifier        {len(lines) / classify_seconds:>12,.0f} lines/s  "
+          + ", ".join(f"{len(v)} {k}" for k, v in found.items()))
+    print(f"  IndicatorClassifier, bare  {len(bare) / bare_seconds:>12,.0f} lines/s  {len(bare)} bare list lines")
+
+    # A URL written without its scheme must stay a URL: its bare host would
+    # flag every URL on the host and, through the domain trie, its subdomains
+    schemeless = ["docs.google.com/forms/d/e/abc/viewform", "evil.example:8080/gate.php",
+                  "cdn.example.net?id=1", "2024-05-01,analyst,url,files.example.org/dl/x.zip,#phishing",
+                  "d41d8cd98f00b204e9800998ecf8427e.evil.example/payload"]
+    bare_hosts = [value for line in schemeless
+                  for value in classifier.classify([line])[0]["urls"] if "://" not in value]
+    print(f"  scheme-less URLs kept whole: {'yes' if not bare_hosts else 'NO ' + ', '.join(bare_hosts)}")
+    return 0 if not bare_hosts else 1
+
+
+def bench_parse(args):
+    """Parse-stage wall time of large bodies by number of parse processes"""
+    module = load_collector_module()
+    # The three largest sources, each served as a body of args.lines records
+    sources = {
+        "ips": ["https://raw.githubusercontent.com/ktsaou/blocklist-ipsets/master/firehol_level1.netset"],
+        "urls": ["https://nocdn.nrd-list.com/0/nrd-list-32-days.txt",
+                 "https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/year.csv"]
+    }
+    bodies = {}
+    for feed_type, urls in sources.items():
+        for url in urls:
+            bodies[url] = synthetic_feed(feed_format(url, feed_type), url, args.lines).splitlines()
+    total = sum(len(lines) for lines in bodies.values())
+    print(f"{total} lines in {len(bodies)} bodies, {os.cpu_count()} CPUs")
+    # Parent CPU is the serial part left after handing chunks to the pool, which
+    # bounds the speedup on a machine with enough cores
+    print(f"  {'processes':>9} {'parse s':>8} {'parent CPU s':>13} {'lines/s':>11} {'speedup':>8}  result")
+    baseline = reference = None
+    for processes in args.processes:
+        collector = module.ThreatIntelCollector(cache_dir=None, parse_processes=processes)
+        collector.c2_feeds = {}
+        collector.base_feeds = sources
+        # Bodies come from memory, so the collect phase is all parsing
+        collector.fetch_feed = lambda url, feed_name: iter(bodies[url])
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            start, cpu_start = time.perf_counter(), time.process_time()
+            all_data = collector.collect_feeds()
+            elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        finally:
+            sys.stdout = stdout
+        result = (list(all_data["ips"].iter_sources()), list(all_data["urls"].items()))
+        baseline = baseline or elapsed
+        reference = reference or result
+        print(f"  {processes:>9} {elapsed:>8.2f} {cpu:>13.2f} {total / elapsed:>11,.0f} {baseline / elapsed:>7.2f}x  "
+              f"{'identical' if result == reference else 'DIFFERENT'}")
+    return 0
+
+
+def bench_shards(args):
+    """Bytes a client transfers per run: whole gzipped feeds vs syncing changed shards"""
+    module = load_collector_module()
+    rng = random.Random(31)
+    data = {
+        "ips": {".".join(str(rng.randrange(1, 255)) for _ in range(4)) for _ in range(args.indicators)},
+        "urls": {f"http://host{rng.randrange(10**9)}.example/{rng.randrange(10**6)}" for _ in range(args.indicators)},
+        "hashes": {"%064x" % rng.getrandbits(256) for _ in range(args.indicators)}
+    }
+    feeds = (("ips", "argonisintel_IP_Feed.txt", "IP", "IPs", module.ip_sort_key),
+             ("urls", "argonisintel_URL_Feed.txt", "URL", "URLs", None),
+             ("hashes", "argonisintel_Hash_Feed.txt", "Hash", "Hashes", None))
+
+    with tempfile.TemporaryDirectory() as out_dir, tempfile.TemporaryDirectory() as mirror:
+        collector = module.ThreatIntelCollector(cache_dir=None, write_deltas=False, write_shards=True)
+        collector.data_dir = Path(out_dir)
+
+        def publish():
+            stores = collector.new_stores()
+            stores["ips"].update(data["ips"])
+            stores["urls"].update(data["urls"], 1)
+            stores["hashes"].update(data["hashes"], 1)
+            full = 0
+            for feed_type, filename, title, label, sort_key in feeds:
+                collector.write_feed(filename, title, label, stores[feed_type], len(stores[feed_type]), sort_key)
+                full += len(gzip.compress((Path(out_dir) / filename).read_bytes()))
+            return collector.publish_shards(), full
+
+        stats, full = publish()
+        module.sync_shards(out_dir, mirror)
+        print(f"{args.indicators} indicators per feed, {stats['shards']} shards")
+        print(f"  {'churn':>7} {'changed shards':>15} {'sync':>10} {'whole feeds':>12} {'saved':>7}")
+        for churn in args.churn:
+            # Replace a share of every feed with new indicators
+            changes = int(args.indicators * churn)
+            for feed_type, values in data.items():
+                for value in rng.sample(sorted(values), changes):
+                    values.discard(value)
+            data["ips"].update(".".join(str(rng.randrange(1, 255)) for _ in range(4)) for _ in range(changes))
+            data["urls"].update(f"http://host{rng.randrange(10**9)}.example/1" for _ in range(changes))
+            data["hashes"].update("%064x" % rng.getrandbits(256) for _ in range(changes))
+            stats, full = publish()
+            fetched, _, _, size = module.sync_shards(out_dir, mirror)
+            print(f"  {churn:>7.2%} {fetched:>7}/{stats['shards']:<7} {module.format_bytes(size):>10} "
+                  f"{module.format_bytes(full):>12} {1 - size / full:>7.1%}")
+
+        with tempfile.TemporaryDirectory() as partial:
+            _, _, _, size = module.sync_shards(out_dir, partial, ["sha256-*"])
+            whole = len(gzip.compress((Path(out_dir) / "argonisintel_Hash_Feed.txt").read_bytes()))
+            print(f"  SHA256 shards only: {module.format_bytes(size)} vs {module.format_bytes(whole)} whole hash feed")
+        with tempfile.TemporaryDirectory() as partial:
+            _, _, _, size = module.sync_shards(out_dir, partial, ["ipv4-010"])
+            whole = len(gzip.compress((Path(out_dir) / "argonisintel_IP_Feed.txt").read_bytes()))
+            print(f"  one IPv4 /8 (10/8): {module.format_bytes(size)} vs {module.format_bytes(whole)} whole IP feed")
+    return 0
+
+
+def bench_ipstore(args):
+    """Memory and time per million addresses: set of strings vs IPStore"""
+    module = load_collector_module()
+    rng = random.Random(11)
+    # Feeds overlap heavily, so draw from a smaller pool to get duplicates
+    pool = args.addresses * 4 // 5
+    packed = [rng.getrandbits(32) for _ in range(pool)]
+    packed += rng.choices(packed, k=args.addresses - pool)
+    per_million = 1e6 / args.addresses
+
+    def texts():
+        # Fresh strings, as the classifier produces them, so the set owns them
+        return (f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}" for a in packed)
+
+    def build_set():
+        ips = set()
+        for ip in texts():
+            ips.add(ip)
+        return ips
+
+    def build_store():
+        store = module.IPStore()
+        store.update(texts())
+        store.compact()
+        return store
+
+    results = {}
+    for label, build, emit in (
+        ("set of str", build_set, sorted),
+        ("IPStore", build_store, list),
+    ):
+        # Memory of the finished structure, measured separately from timing
+        tracemalloc.start()
+        structure = build()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del structure
+
+        start = time.perf_counter()
+        structure = build()
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        count = len(emit(structure))
+        written = time.perf_counter() - start
+        results[label] = (retained, built, written, count)
+        del structure
+
+    print(f"{args.addresses} addresses ({pool} distinct), numpy {'on' if module.np is not None else 'off'}")
+    print(f"  {'':<11} {'MB/M addrs':>11} {'B/addr':>7} {'build s/M':>10} {'sort+text s/M':>14}")
+    for label, (retained, built, written, count) in results.items():
+        print(f"  {label:<11} {retained / 1e6 * per_million:>11.1f} {retained / count:>7.1f} "
+              f"{built * per_million:>10.2f} {written * per_million:>14.2f}")
+    return 0
+
+
+def bench_lookup(args):
+    """Startup time, memory and query latency: text feed in a set vs mmap index"""
+    module = load_collector_module()
+    rng = random.Random(13)
+    store = module.IPStore()
+    store.update(f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}"
+                 for a in (rng.getrandbits(32) for _ in range(args.addresses)))
+    store.compact()
+    queries = [f"{a >> 24}.{a >> 16 & 255}.{a >> 8 & 255}.{a & 255}"
+               for a in (rng.getrandbits(32) for _ in range(args.queries // 2))]
+    queries += rng.sample(list(store), args.queries - len(queries))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = module.ThreatIntelCollector(cache_dir=None, write_deltas=False)
+        collector.data_dir = Path(tmp)
+        collector.write_feed("argonisintel_IP_Feed.txt", "IP", "IPs", store, len(store))
+        collector.write_indexes({"ips": store, "urls": {}, "hashes": {}})
+        feed = Path(tmp) / "argonisintel_IP_Feed.txt"
+        index_path = Path(tmp) / "argonisintel_IP_Feed.idx"
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open(feed) as f:
+            ips = {line.strip() for line in f if line.strip() and not line.startswith("#")}
+        set_open = time.perf_counter() - start
+        set_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        set_hits = sum(query in ips for query in queries)
+        set_query = time.perf_counter() - start
+        del ips
+        gc.collect()
+
+        tracemalloc.start()
+        index = module.FeedIndex(index_path)
+        index_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        index.close()
+        start = time.perf_counter()
+        index = module.FeedIndex(index_path)
+        index_open = time.perf_counter() - start
+        start = time.perf_counter()
+        index_hits = sum(index.contains_ip(query) for query in queries)
+        index_query = time.perf_counter() - start
+        index.close()
+
+        print(f"{len(store)} IPs, index {index_path.stat().st_size / 1e6:.1f} MB "
+              f"vs feed {feed.stat().st_size / 1e6:.1f} MB, {len(queries)} queries")
+        print(f"  {'':<10} {'open ms':>9} {'heap MB':>8} {'us/query':>9} {'hits':>7}")
+        for label, opened, memory, queried, hits in (
+            ("set", set_open, set_memory, set_query, set_hits),
+            ("mmap idx", index_open, index_memory, index_query, index_hits),
+        ):
+            print(f"  {label:<10} {opened * 1000:>9.2f} {memory / 1e6:>8.1f} "
+                  f"{queried / len(queries) * 1e6:>9.2f} {hits:>7}")
+    return 0 if set_hits == index_hits else 1
+
+
+def synthetic_log_lines(count, listed, rng):
+    """Proxy, firewall CSV, DNS JSONL and EDR log lines; about 1 in 50 names a listed indicator"""
+    lines = []
+    for _ in range(count):
+        if rng.randrange(50) == 0:
+            indicator = rng.choice(listed)
+        else:
+            indicator = None
+        ip = ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+        domain = f"site{rng.randrange(10**6)}.example.net"
+        shape = rng.randrange(3)
+        if indicator and len(indicator) == 64:
+            # Endpoint telemetry naming a file by its SHA-256
+            lines.append(f"2024-05-01T10:00:00Z edr01 process_start host=ws{rng.randrange(1000)} "
+                         f"image=C:\\Users\\Public\\{rng.randrange(10**4)}.exe sha256={indicator}")
+        elif shape == 0:
+            host = indicator if indicator and not indicator[0].isdigit() else domain
+            client = indicator if indicator and indicator[0].isdigit() else ip
+            lines.append(f"2024-05-01T10:00:00Z proxy1 {client} GET http://{host}/index.html 200 5123 "
+                         f'"Mozilla/5.0 (Windows NT 10.0; Win64; x64)"')
+        elif shape == 1:
+            destination = indicator if indicator and indicator[0].isdigit() else ip
+            lines.append(f"2024-05-01 10:00:00,fw01,allow,tcp,192.168.{rng.randrange(256)}.{rng.randrange(256)},"
+                         f"{rng.randrange(1024, 65536)},{destination},443,{rng.randrange(10**5)}")
+        else:
+            name = indicator if indicator and not indicator[0].isdigit() else domain
+            lines.append(f'{{"ts":"2024-05-01T10:00:00Z","client":"10.0.{rng.randrange(256)}.{rng.randrange(256)}",'
+                         f'"query":"{name}","type":"A","answer":"{ip}"}}')
+    return lines
+
+
+def bench_match(args):
+    """Log scanning throughput in GB/s against indexes of synthetic feeds"""
+    module = load_collector_module()
+    rng = random.Random(17)
+    store = module.IPStore()
+    listed_ips = [".".join(str(rng.randrange(1, 255)) for _ in range(4)) for _ in range(args.feed_size)]
+    store.update(listed_ips)
+    store.compact()
+    listed_domains = [f"bad{n}.example.org" for n in range(args.feed_size)]
+    listed_hashes = ["%064x" % rng.getrandbits(256) for _ in range(args.feed_size // 4)]
+    # Built like the collector's own stores, which iterate in the sorted order the indexes need
+    urls = module.IndicatorStore()
+    urls.update(set(listed_domains), 1)
+    urls.compact()
+    hashes = module.IndicatorStore()
+    hashes.update(set(listed_hashes), 1)
+    hashes.compact()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = module.ThreatIntelCollector(cache_dir=None)
+        collector.data_dir = Path(tmp)
+        collector.write_indexes({"ips": store, "urls": urls, "hashes": hashes})
+
+        # A few MB of distinct lines, repeated up to the requested size
+        text = "\n".join(synthetic_log_lines(40000, listed_ips + listed_domains + listed_hashes, rng)) + "\n"
+        block = text.encode()
+        log = Path(tmp) / "synthetic.log"
+        target = int(args.size * 1e9)
+        repeats = max(1, target // len(block))
+        with open(log, 'wb') as f:
+            for _ in range(repeats):
+                f.write(block)
+
+        # Hits the indexes must report, worked out from plain sets
+        listed = {"ips": set(listed_ips), "urls": set(listed_domains), "hashes": set(listed_hashes)}
+        expected = repeats * sum(
+            1 for _, feed_type, value in module.IndicatorClassifier().scan(text)
+            if value in listed[feed_type]
+            or (feed_type == "urls" and "://" in value and module._url_host(value) in listed["urls"])
+        )
+        size = log.stat().st_size
+        print(f"{size / 1e9:.2f} GB log, {len(store)} IPs / {len(listed_domains)} domains / "
+              f"{len(hashes)} hashes listed, {expected} expected hits, {os.cpu_count()} CPUs")
+
+        print(f"  {'processes':>9} {'seconds':>8} {'GB/s':>6} {'hits':>9}")
+        correct = True
+        for processes in args.processes:
+            start = time.perf_counter()
+            hits = sum(1 for _ in module.match_log(log, tmp, processes))
+            elapsed = time.perf_counter() - start
+            print(f"  {processes:>9} {elapsed:>8.1f} {size / 1e9 / elapsed:>6.3f} {hits:>9}")
+            correct = correct and hits == expected
+    # A throughput measured against a broken index means nothing
+    print(f"  hits match the listed indicators: {'yes' if correct else 'NO'}")
+    return 0 if correct else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Argonis Intel collector benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch = subparsers.add_parser("fetch", help="serial vs concurrent fetch wall-clock time")
+    fetch.add_argument("--latency", type=float, default=0.2, help="injected per-request latency (s)")
+    fetch.add_argument("--jitter", type=float, default=0.05, help="random extra latency (s)")
+    fetch.add_argument("--lines", type=int, default=200, help="lines per synthetic feed")
+    fetch.add_argument("--workers", type=int, default=16)
+    fetch.add_argument("--per-host", type=int, default=4)
+    fetch.set_defaults(func=bench_fetch)
+
+    cache = subparsers.add_parser("cache", help="cold run vs conditional-GET revalidated run")
+    cache.add_argument("--latency", type=float, default=0.05, help="injected per-request latency (s)")
+    cache.add_argument("--lines", type=int, default=2000, help="lines per synthetic feed")
+    cache.set_defaults(func=bench_cache)
+
+    session = subparsers.add_parser("session", help="connections and handshakes, per-URL requests.get vs pooled sessions")
+    session.add_argument("--handshake", type=float, default=0.05, help="injected per-connection setup time (s)")
+    session.add_argument("--latency", type=float, default=0.02, help="injected per-request latency (s)")
+    session.add_argument("--lines", type=int, default=2000, help="lines per synthetic feed")
+    session.add_argument("--workers", type=int, default=16)
+    session.add_argument("--per-host", type=int, default=4)
+    session.set_defaults(func=bench_session)
+
+    memory = subparsers.add_parser("memory", help="peak RSS of a large feed, streamed vs buffered")
+    memory.add_argument("--sizes", type=int, nargs="+", default=[100, 400],
+                        help="synthetic feed sizes in MB")
+    memory.add_argument("--distinct", type=int, default=50000,
+                        help="distinct IPs repeated through the feed")
+    memory.set_defaults(func=bench_memory)
+
+    classify = subparsers.add_parser("classify", help="indicator classifier throughput")
+    classify.add_argument("--lines", type=int, default=1000000)
+    classify.set_defaults(func=bench_classify)
+
+    parse = subparsers.add_parser("parse", help="parse-stage speedup of large bodies by process count")
+    parse.add_argument("--lines", type=int, default=500000, help="records per large body")
+    parse.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parse.set_defaults(func=bench_parse)
+
+    shards = subparsers.add_parser("shards", help="client transfer per run: whole feeds vs changed shards")
+    shards.add_argument("--indicators", type=int, default=200000, help="indicators per feed")
+    shards.add_argument("--churn", type=float, nargs="+", default=[0.0001, 0.001, 0.01],
+                        help="share of each feed replaced between runs")
+    shards.set_defaults(func=bench_shards)
+
+    ipstore = subparsers.add_parser("ipstore", help="set of strings vs packed IPStore")
+    ipstore.add_argument("--addresses", type=int, default=1000000)
+    ipstore.set_defaults(func=bench_ipstore)
+
+    lookup = subparsers.add_parser("lookup", help="text feed loaded into a set vs mmap binary index")
+    lookup.add_argument("--addresses", type=int, default=1000000)
+    lookup.add_argument("--queries", type=int, default=100000)
+    lookup.set_defaults(func=bench_lookup)
+
+    match = subparsers.add_parser("match", help="log matching throughput in GB/s")
+    match.add_argument("--size", type=float, default=2.0, help="synthetic log size in GB")
+    match.add_argument("--feed-size", type=int, default=100000, help="listed IPs and listed domains")
+    match.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    match.set_defaults(func=bench_match)
+
+    schedule = subparsers.add_parser("schedule", help="simulated traffic and staleness of adaptive refresh")
+    schedule.add_argument("--sources", type=int, default=105)
+    schedule.add_argument("--days", type=int, default=14)
+    schedule.set_defaults(func=bench_schedule)
+
+    suite = subparsers.add_parser("suite", help="end-to-end runtime, peak memory and indicators/s per scenario")
+    suite.add_argument("--scenarios", nargs="+", choices=SUITE_SCENARIOS, default=list(SUITE_SCENARIOS))
+    suite.add_argument("--lines", type=int, default=20000, help="records per synthetic feed")
+    suite.add_argument("--workers", type=int, default=16)
+    suite.add_argument("--latency", type=float, default=0.2, help="latency scenario: per-request latency (s)")
+    suite.add_argument("--jitter", type=float, default=0.1, help="latency scenario: random extra latency (s)")
+    suite.add_argument("--error-rate", type=float, default=0.2, help="errors scenario: share of 503 answers")
+    suite.add_argument("--drip-bytes", type=int, default=4096, help="slow-drip scenario: bytes per write")
+    suite.add_argument("--drip-interval", type=float, default=0.005, help="slow-drip scenario: pause per write (s)")
+    suite.add_argument("--label", help="name of this version in the results (default: git describe)")
+    suite.add_argument("--output", help="write the results as JSON for later --compare runs")
+    suite.add_argument("--compare", help="results JSON of an earlier version to compare against")
+    suite.set_defaults(func=bench_suite)
+
+    spill = subparsers.add_parser("spill", help="peak memory of writing the feeds, in memory vs spilled runs")
+    spill.add_argument("--counts", type=int, nargs="+", default=[1000000, 3000000],
+                       help="indicators added to the stores")
+    spill.add_argument("--threshold", type=int, default=200000, help="spill threshold per feed type")
+    spill.set_defaults(func=bench_spill)
+
+    spill_check = subparsers.add_parser("spill-check", help="feeds and counts after single-run spills match in-memory")
+    spill_check.set_defaults(func=bench_spill_check)
+
+    spill_child = subparsers.add_parser("spill-probe", help=argparse.SUPPRESS)
+    spill_child.add_argument("count", type=int)
+    spill_child.add_argument("--threshold", type=int, default=0)
+    spill_child.set_defaults(func=spill_probe)
+
+    suite_child = subparsers.add_parser("suite-probe", help=argparse.SUPPRESS)
+    suite_child.add_argument("table")
+    suite_child.add_argument("--workers", type=int, default=16)
+    suite_child.set_defaults(func=suite_probe)
+
+    probe = subparsers.add_parser("memory-probe", help=argparse.SUPPRESS)
+    probe.add_argument("url")
+    probe.add_argument("--mode", choices=("streaming", "buffered"), default="streaming")
+    probe.set_defaults(func=memory_probe)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,12 +2,2061 @@ import requests
 import json
 from datetime import datetime
 from pathlib import Path
+import os
 import time
+import re
+import csv
+import io
+import gzip
+import codecs
+import contextlib
+import fnmatch
+import itertools
+import ipaddress
+import socket
+import hashlib
+import math
+import random
+import sys
+import mmap
+import struct
+import bisect
+import heapq
+import tempfile
+import argparse
+import threading
+import sqlite3
 import concurrent.futures
+from collections import deque
+from array import array
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional: only used to vectorize sort/unique in IPStore
+    np = None
+
+try:
+    import zstandard
+except ImportError:
+    # Optional: only needed for zstd-compressed feed shards
+    zstandard = None
+
+class FeedCache:
+    """On-disk copy of each feed response, revalidated with conditional GETs"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def _load_meta(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not body_path.exists():
+            return None
+        return meta
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a cached URL"""
+        meta = self._load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def open(self, url):
+        """Return (chunks, size, encoding) for the cached body, or None when nothing is cached"""
+        meta = self._load_meta(url)
+        if meta is None:
+            return None
+        try:
+            f = open(self._paths(url)[1], 'rb')
+        except OSError:
+            return None
+        return read_chunks(f), os.fstat(f.fileno()).st_size, meta.get("encoding") or "utf-8"
+
+    def writer(self, url, response):
+        """Return a CacheWriter for a 200 response
+
+        Bodies without validators are kept too: they cannot be revalidated
+        but still serve as the last good copy when the source fails.
+        """
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding
+        }
+        return CacheWriter(*self._paths(url), meta)
+
+
+class CacheWriter:
+    """Tees a streamed response body into the cache, replacing the old entry on commit"""
+
+    def __init__(self, meta_path, body_path, meta):
+        self.meta_path = meta_path
+        self.body_path = body_path
+        self.meta = meta
+        self.size = 0
+        # Write to private temp files first so concurrent fetches never see half a body
+        suffix = f".tmp{os.getpid()}-{threading.get_ident()}"
+        self.body_tmp = body_path.with_name(body_path.name + suffix)
+        self.meta_tmp = meta_path.with_name(meta_path.name + suffix)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.body_tmp, 'wb')
+
+    def tee(self, chunks):
+        """Pass chunks through while writing them to the temp body"""
+        for chunk in chunks:
+            self.file.write(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    def commit(self):
+        self.file.close()
+        self.meta["size"] = self.size
+        self.meta["stored"] = int(time.time())
+        with open(self.meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(self.body_tmp, self.body_path)
+        os.replace(self.meta_tmp, self.meta_path)
+
+    def discard(self):
+        if not self.file.closed:
+            self.file.close()
+        for path in (self.body_tmp, self.meta_tmp):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class CircuitBreaker:
+    """Per-source run failure counts, persisted so dead sources are skipped for a cool-down
+
+    After threshold failed runs in a row a source is skipped until cooldown
+    seconds have passed; the next run then tries it once more.
+    """
+
+    def __init__(self, path=None, threshold=3, cooldown=6 * 3600):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = {}
+        self._lock = threading.Lock()
+        if self.path:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+
+    def is_open(self, url):
+        """True while a failing source is cooling down"""
+        with self._lock:
+            entry = self.state.get(url)
+            return bool(entry) and entry.get("open_until", 0) > time.time()
+
+    def failures(self, url):
+        with self._lock:
+            return self.state.get(url, {}).get("failures", 0)
+
+    def record(self, url, ok):
+        with self._lock:
+            if ok:
+                self.state.pop(url, None)
+                return
+            entry = self.state.setdefault(url, {"failures": 0})
+            entry["failures"] += 1
+            if entry["failures"] >= self.threshold:
+                entry["open_until"] = int(time.time() + self.cooldown)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class RefreshSchedule:
+    """Learns how often each source changes from body digests and schedules its next fetch
+
+    A source whose body changed since the last fetch has its refresh
+    interval halved; an unchanged one has it doubled, within
+    [min_interval, max_interval]. Between fetches the source is served
+    from its cached snapshot.
+    """
+
+    def __init__(self, path=None, min_interval=3600, max_interval=24 * 3600):
+        self.path = Path(path) if path else None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.state = {}
+        self._lock = threading.Lock()
+        if self.path:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+
+    def is_due(self, url, now=None):
+        """True if the source should be fetched on this run"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.state.get(url)
+            # Runs start a little earlier or later each time; don't skip a run over seconds
+            return entry is None or now >= entry["next"] - self.min_interval / 10
+
+    def observe(self, url, digest, now=None):
+        """Record a completed fetch; digest None means the source answered 304 Not Modified"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.state.setdefault(url, {"interval": self.min_interval, "digest": None})
+            if digest is not None and digest != entry["digest"]:
+                entry["digest"] = digest
+                entry["changed"] = int(now)
+                entry["interval"] = max(self.min_interval, entry["interval"] / 2)
+            else:
+                entry["interval"] = min(self.max_interval, entry["interval"] * 2)
+            entry["checked"] = int(now)
+            entry["next"] = int(now + entry["interval"])
+
+    def forget(self, url):
+        with self._lock:
+            self.state.pop(url, None)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class DeadlineExceeded(Exception):
+    """The run deadline passed while a source was still being fetched"""
+
+
+# Metrics dict of the source a thread is currently requesting, charged for new connections
+_connection_metrics = threading.local()
+
+
+class HandshakeTimer:
+    """Connection mixin adding connect time (TCP, plus TLS for https) to the current source's metrics"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            metrics = getattr(_connection_metrics, "current", None)
+            if metrics is not None:
+                metrics["connections"] += 1
+                metrics["handshake_seconds"] += time.perf_counter() - started
+
+
+class TimedHTTPConnection(HandshakeTimer, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(HandshakeTimer, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """Keep-alive connection pools, one per host, that time the handshakes they make
+
+    pool_size connections per host are kept open between requests; retries
+    are left to the caller.
+    """
+
+    def __init__(self, pool_size=4, hosts=256):
+        super().__init__(pool_connections=hosts, pool_maxsize=pool_size, max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool
+        }
+
+
+def pooled_session(adapter):
+    """A requests session sending every request through adapter's connection pools"""
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+CHUNK_SIZE = 64 * 1024
+LINE_BREAKS = ("\n", "\r", "\v", "\f", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+
+def read_chunks(f, size=CHUNK_SIZE):
+    """Yield fixed-size chunks from a binary file, closing it when exhausted"""
+    with f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+def _last_line(text):
+    """The final line of text including its terminator, without splitting all of it"""
+    start = max(text.rfind(brk, 0, len(text) - 1) for brk in LINE_BREAKS)
+    return text[start + 1:]
+
+
+def iter_lines(chunks, encoding="utf-8"):
+    """Incrementally decode byte chunks and yield lines exactly as str.splitlines() would"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        if not text:
+            continue
+        # Hold back an unterminated tail, and a bare \r that may be half of \r\n
+        if text.endswith("\r") or not text.endswith(LINE_BREAKS):
+            pending = _last_line(text)
+            text = text[:len(text) - len(pending)]
+        else:
+            pending = ""
+        yield from text.splitlines()
+    yield from (pending + decoder.decode(b"", final=True)).splitlines()
+
+
+def format_bytes(size):
+    """Human readable byte count"""
+    if size < 1024:
+        return f"{size} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}"
+
+
+_IPV4 = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?:\.(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}"
+
+# Pseudo-TLDs that are really file extensions ("invoice.pdf", "loader.exe")
+_FILE_EXTENSIONS = {
+    "exe", "dll", "bin", "elf", "msi", "lnk", "hta", "bat", "cmd", "vbs", "jar",
+    "apk", "iso", "php", "asp", "aspx", "htm", "html", "js", "txt", "pdf", "doc",
+    "docx", "xls", "xlsx", "csv", "json", "xml", "jpg", "jpeg", "png", "gif"
+}
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21}
+# Start of the port, path or query of a host written without a scheme
+_HOST_SUFFIX = re.compile(r"[:/?]")
+_SIMPLE_URL = re.compile(r"(https?|ftp)://([a-z0-9-]+(?:\.[a-z0-9-]+)*)(/[^?#]*)?(\?[^#]+)?\Z")
+
+
+def normalize_host(host):
+    """Lowercase ASCII (IDNA) form of a hostname without the trailing dot, or None"""
+    host = host.rstrip(".").lower()
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    return host or None
+
+
+def normalize_url(url):
+    """Canonical form of a URL, or None when it cannot be parsed
+
+    Scheme and host are lowercased, the host is IDNA-encoded, default ports,
+    fragments and trailing slashes are dropped; the path keeps its case.
+    """
+    simple = _SIMPLE_URL.match(url)
+    if simple:
+        # Already lowercase ASCII with no port or userinfo, the common case
+        scheme, host, path, query = simple.groups()
+        return f"{scheme}://{host}{(path or '').rstrip('/') or '/'}{query or ''}"
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = normalize_host(parts.hostname or "")
+    if host is None:
+        return None
+    netloc = f"[{host}]" if ":" in host else host
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    path = parts.path.rstrip("/") or "/"
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{scheme}://{netloc}{path}{query}"
+
+
+def url_lookup_key(value):
+    """Normalized form of a URL or domain as it is stored in the URL feed"""
+    value = value.strip()
+    if "://" in value:
+        return normalize_url(value) or value
+    if "/" in value or "?" in value:
+        # Written without a scheme, as the classifier publishes it with http://
+        return normalize_url(f"http://{value}") or value
+    return normalize_host(value) or value
+
+
+class IndicatorClassifier:
+    """Extracts IPv4/IPv6 addresses, CIDRs, URLs, domains and MD5/SHA1/SHA256 hashes
+
+    All indicator kinds are matched by one precompiled pattern, so a whole
+    batch of lines is classified in a single regex pass. Every match starts
+    by consuming the delimiter in front of the indicator, which lets the
+    regex engine jump from delimiter to delimiter instead of trying each
+    character of a line.
+    """
+
+    PATTERN = re.compile(r"""
+        [\s,;"'<>|=(){}\[\]#:`]
+        (?:
+            (?P<url>(?:[Hh][Tt][Tt][Pp][Ss]?|[Ff][Tt][Pp])://[^\s"'<>,]+)
+          | (?P<ipv4>""" + _IPV4 + r"""(?:/(?:3[0-2]|[12]?\d))?)(?![\w.]|/\d)
+          | (?P<ipv6>(?:[0-9A-Fa-f]{1,4}|:)(?::[0-9A-Fa-f]{0,4}){2,7}(?:/\d{1,3})?)(?![\w:.])
+          | (?P<hash>[0-9A-Fa-f]{64}|[0-9A-Fa-f]{40}|[0-9A-Fa-f]{32})(?![\w.-])
+          | (?P<domain>(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+
+                       (?:[A-Za-z]{2,63}|xn--[A-Za-z0-9-]{1,59})
+                       (?:(?::\d{1,5})?[/?][^\s"'<>,]*|(?=\.?(?![\w.@/-]))))
+        )
+    """, re.VERBOSE)
+
+    # Bodies with one indicator per line (NRD, FireHOL, hash lists) are
+    # recognised a whole batch at a time by one anchored match and skip the
+    # delimiter scan.
+    BARE_BLOCKS = {
+        "ipv4": re.compile(r"(?:" + _IPV4 + r"(?:/(?:3[0-2]|[12]?\d))?\n)+"),
+        "hash": re.compile(r"(?:(?:[0-9A-Fa-f]{64}|[0-9A-Fa-f]{40}|[0-9A-Fa-f]{32})\n)+"),
+        "domain": re.compile(r"""(?:
+            (?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+
+            (?:[A-Za-z]{2,63}|xn--[A-Za-z0-9-]{1,59})\n
+        )+""", re.VERBOSE)
+    }
+
+    # Feed type each indicator kind is published in
+    CATEGORIES = {
+        "url": "urls",
+        "domain": "urls",
+        "ipv4": "ips",
+        "ipv6": "ips",
+        "hash": "hashes"
+    }
+
+    def normalize(self, kind, value):
+        """Canonical text of a matched indicator, or None when it fails validation"""
+        if kind == "ipv4":
+            return value
+        if kind == "url":
+            return normalize_url(value.rstrip("."))
+        if kind == "hash":
+            return value.lower()
+        if kind == "domain":
+            suffix = _HOST_SUFFIX.search(value)
+            host = value[:suffix.start()] if suffix else value
+            if host.rsplit(".", 1)[1].lower() in _FILE_EXTENSIONS:
+                return None
+            if suffix:
+                # A host with a port, path or query is a URL written without its
+                # scheme; publishing the bare host would list every URL on it
+                return normalize_url(f"http://{value.rstrip('.')}")
+            return value.lower()
+        try:
+            if "/" in value:
+                return str(ipaddress.IPv6Network(value, strict=False))
+            return ipaddress.IPv6Address(value).compressed
+        except ValueError:
+            return None
+
+    def bare_block(self, text):
+        """Kind shared by every line of a block of bare indicators, else None"""
+        text += "\n"
+        for kind, pattern in self.BARE_BLOCKS.items():
+            if pattern.fullmatch(text):
+                return kind
+        return None
+
+    def scan(self, text):
+        """Yield (offset, feed_type, indicator) for every indicator in a block of text"""
+        # The leading newline gives the first line a delimiter to match against
+        for match in self.PATTERN.finditer("\n" + text):
+            kind = match.lastgroup
+            value = self.normalize(kind, match.group(kind))
+            if value is not None:
+                yield match.start(kind) - 1, self.CATEGORIES[kind], value
+
+    def extract(self, text):
+        """Yield (line_number, feed_type, indicator) for every indicator in a block of lines"""
+        line_number = 0
+        position = 0
+        for offset, feed_type, value in self.scan(text):
+            line_number += text.count("\n", position, offset)
+            position = offset
+            yield line_number, feed_type, value
+
+    def select_column(self, lines, hint):
+        """Reduce each line to the column named by a source hint"""
+        column = hint["column"]
+        delimiter = hint.get("delimiter")
+        if delimiter is None:
+            # Whitespace separated, e.g. hostfiles
+            return [fields[column] for fields in map(str.split, lines) if len(fields) > column]
+        # One reader per line, so a stray quote can't swallow the rows after it
+        values = []
+        for line in lines:
+            try:
+                row = next(csv.reader((line,), delimiter=delimiter), ())
+            except csv.Error:
+                # Dropped here, so classify() counts the line as rejected
+                continue
+            if len(row) > column:
+                values.append(row[column])
+        return values
+
+    def classify(self, lines, hint=None):
+        """Classify a batch of lines; returns ({feed_type: set}, lines_with_indicators)"""
+        if hint:
+            lines = self.select_column(lines, hint)
+        found = {
+            "ips": set(),
+            "urls": set(),
+            "hashes": set()
+        }
+        text = "\n".join(lines)
+        kind = self.bare_block(text)
+        if kind == "ipv4":
+            found["ips"].update(lines)
+            return found, len(lines)
+        if kind == "hash":
+            found["hashes"].update(text.lower().split("\n"))
+            return found, len(lines)
+        if kind == "domain":
+            domains = [domain for domain in text.lower().split("\n")
+                       if domain.rpartition(".")[2] not in _FILE_EXTENSIONS]
+            found["urls"].update(domains)
+            return found, len(domains)
+        
+        matched_lines = set()
+        for line_number, feed_type, value in self.extract(text):
+            found[feed_type].add(value)
+            matched_lines.add(line_number)
+        return found, len(matched_lines)
+
+
+SPILL_BLOCK = 1 << 20
+_V6_RECORD = struct.Struct(">QQBH")
+
+
+def spill_file(spill_dir=None):
+    """Anonymous temporary file for one sorted run; it disappears once closed"""
+    return tempfile.TemporaryFile(prefix="argonisintel-", suffix=".run", dir=spill_dir)
+
+
+def read_run(f, width=None):
+    """Yield width-byte records, or lines when width is None, from a spilled run
+
+    Reads keep their own offset, so several readers can share one file.
+    """
+    block = width * (SPILL_BLOCK // width) if width else SPILL_BLOCK
+    offset = 0
+    pending = b""
+    while True:
+        f.seek(offset)
+        chunk = f.read(block)
+        if not chunk:
+            break
+        offset += len(chunk)
+        if width:
+            for start in range(0, len(chunk), width):
+                yield chunk[start:start + width]
+        else:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            yield from lines
+
+
+def merge_runs(runs, width):
+    """Streaming k-way merge of sorted fixed-width runs, dropping duplicate records"""
+    previous = None
+    for record in heapq.merge(*(read_run(f, width) for f in runs)):
+        if record != previous:
+            yield record
+            previous = record
+
+
+def sorted_records(records, width, limit=None, spill_dir=None):
+    """Distinct fixed-width byte records in ascending order
+
+    With a limit, at most that many records are held in memory; each full
+    batch is sorted into a temporary run and the runs are merged.
+    """
+    if not limit:
+        yield from sorted(set(records))
+        return
+    runs = []
+    batch = set()
+    for record in records:
+        batch.add(record)
+        if len(batch) >= limit:
+            runs.append(spill_file(spill_dir))
+            runs[-1].write(b"".join(sorted(batch)))
+            batch = set()
+    if not runs:
+        yield from sorted(batch)
+        return
+    if batch:
+        runs.append(spill_file(spill_dir))
+        runs[-1].write(b"".join(sorted(batch)))
+    for f in runs:
+        f.flush()
+    try:
+        yield from merge_runs(runs, width)
+    finally:
+        for f in runs:
+            f.close()
+
+
+class IPStore:
+    """IPv4/IPv6 addresses and CIDRs packed as integers in array-backed buffers
+
+    IPv4 entries are 64-bit keys (address << 24 | prefix length << 16 |
+    source ID) and IPv6 entries are four parallel arrays (high 64 bits,
+    low 64 bits, prefix length, source ID). Sorting the keys sorts the
+    addresses numerically, so 10.0.0.2 comes before 10.0.0.10. Addresses
+    are only turned back into text when iterated. Single hosts carry
+    prefix length 32 or 128.
+
+    Compaction deduplicates (address, source) pairs, so an address reported
+    by several sources keeps one entry per source; iteration folds those
+    into one address and, through iter_sources(), a source bitmap.
+
+    With a spill_limit, a compaction that leaves more entries than that
+    writes them to a temporary file as a sorted run of big-endian records
+    and empties the buffers. Reading merges the runs into one, so memory
+    stays bounded however many addresses are added.
+    """
+
+    def __init__(self, compact_every=1 << 20, spill_limit=None, spill_dir=None):
+        self._v4 = array('Q')
+        self._v6_high = array('Q')
+        self._v6_low = array('Q')
+        self._v6_prefix = array('B')
+        self._v6_source = array('H')
+        self._compact_every = min(compact_every, spill_limit) if spill_limit else compact_every
+        self._pending = 0
+        self._sorted = True
+        self._unique = 0
+        self._spill_limit = spill_limit
+        self._spill_dir = spill_dir
+        self._runs = {4: [], 6: []}
+        # Distinct addresses in each family's single merged run (None: not counted yet)
+        self._run_unique = {4: None, 6: None}
+
+    def add(self, value, source=0):
+        """Add an address or CIDR in text form; returns False if it does not parse"""
+        address, _, prefix = value.partition("/")
+        try:
+            if ":" in address:
+                packed = int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+                length = int(prefix) if prefix else 128
+                if not 0 <= length <= 128:
+                    return False
+                # Keep only the network bits of a CIDR
+                packed &= ((1 << 128) - 1) ^ ((1 << (128 - length)) - 1)
+                self._v6_high.append(packed >> 64)
+                self._v6_low.append(packed & 0xFFFFFFFFFFFFFFFF)
+                self._v6_prefix.append(length)
+                self._v6_source.append(source)
+            else:
+                packed = int.from_bytes(socket.inet_aton(address), "big")
+                length = int(prefix) if prefix else 32
+                if not 0 <= length <= 32 or address.count(".") != 3:
+                    return False
+                packed &= 0xFFFFFFFF ^ ((1 << (32 - length)) - 1)
+                self._v4.append(packed << 24 | length << 16 | source)
+        except (OSError, ValueError):
+            return False
+        self._sorted = False
+        self._pending += 1
+        if self._pending >= self._compact_every:
+            self._sort_buffers()
+        return True
+
+    def update(self, values, source=0):
+        """Add every address in an iterable of text values, or another IPStore"""
+        if isinstance(values, IPStore):
+            if values._runs[4] or values._runs[6]:
+                self._merge_spilled(values)
+                return
+            self._v4.extend(values._v4)
+            self._v6_high.extend(values._v6_high)
+            self._v6_low.extend(values._v6_low)
+            self._v6_prefix.extend(values._v6_prefix)
+            self._v6_source.extend(values._v6_source)
+            self._sorted = False
+            self._pending += len(values._v4) + len(values._v6_prefix)
+            if self._pending >= self._compact_every:
+                self._sort_buffers()
+            return
+        # Fast path for plain dotted-quad hosts, the bulk of every feed
+        append = self._v4.append
+        aton = socket.inet_aton
+        from_bytes = int.from_bytes
+        host = 32 << 16 | source
+        added = 0
+        for value in values:
+            if "/" in value or ":" in value or value.count(".") != 3:
+                self.add(value, source)
+                # add() may have compacted into a new buffer
+                append = self._v4.append
+                continue
+            try:
+                append(from_bytes(aton(value), "big") << 24 | host)
+            except OSError:
+                continue
+            added += 1
+        if added:
+            self._sorted = False
+            self._pending += added
+            if self._pending >= self._compact_every:
+                self._sort_buffers()
+
+    def _merge_spilled(self, other):
+        """Stream another store's entries, spilled runs included, through the buffers"""
+        other.compact()
+        for version in (4, 6):
+            entries = other._family(version)
+            while True:
+                block = list(itertools.islice(entries, SPILL_BLOCK))
+                if not block:
+                    break
+                if version == 4:
+                    self._v4.extend(network << 24 | length << 16 | source for network, length, source in block)
+                else:
+                    for network, length, source in block:
+                        self._v6_high.append(network >> 64)
+                        self._v6_low.append(network & 0xFFFFFFFFFFFFFFFF)
+                        self._v6_prefix.append(length)
+                        self._v6_source.append(source)
+                self._sorted = False
+                self._pending += len(block)
+                if self._pending >= self._compact_every:
+                    self._sort_buffers()
+
+    def _sort_buffers(self):
+        """Sort and deduplicate the buffers in place, spilling them past spill_limit"""
+        if np is not None:
+            keys = np.unique(np.frombuffer(self._v4, dtype=np.uint64))
+            self._v4 = array('Q', keys.tobytes())
+            unique = int(np.count_nonzero(np.diff(keys >> 16))) + 1 if len(keys) else 0
+            if self._v6_prefix:
+                high = np.frombuffer(self._v6_high, dtype=np.uint64)
+                low = np.frombuffer(self._v6_low, dtype=np.uint64)
+                prefix = np.frombuffer(self._v6_prefix, dtype=np.uint8)
+                source = np.frombuffer(self._v6_source, dtype=np.uint16)
+                order = np.lexsort((source, prefix, low, high))
+                high, low, prefix, source = high[order], low[order], prefix[order], source[order]
+                same_address = (high[1:] == high[:-1]) & (low[1:] == low[:-1]) & (prefix[1:] == prefix[:-1])
+                keep = np.ones(len(order), dtype=bool)
+                keep[1:] = ~same_address | (source[1:] != source[:-1])
+                self._v6_high = array('Q', high[keep].tobytes())
+                self._v6_low = array('Q', low[keep].tobytes())
+                self._v6_prefix = array('B', prefix[keep].tobytes())
+                self._v6_source = array('H', source[keep].tobytes())
+                unique += int(np.count_nonzero(~same_address)) + 1
+        else:
+            self._v4 = array('Q', sorted(set(self._v4)))
+            unique = len({key >> 16 for key in self._v4})
+            if self._v6_prefix:
+                entries = sorted(set(zip(self._v6_high, self._v6_low, self._v6_prefix, self._v6_source)))
+                self._v6_high = array('Q', (entry[0] for entry in entries))
+                self._v6_low = array('Q', (entry[1] for entry in entries))
+                self._v6_prefix = array('B', (entry[2] for entry in entries))
+                self._v6_source = array('H', (entry[3] for entry in entries))
+                unique += len({entry[:3] for entry in entries})
+        self._unique = unique
+        self._pending = 0
+        self._sorted = True
+        if self._spill_limit and len(self._v4) + len(self._v6_prefix) >= self._spill_limit:
+            self._spill()
+
+    def _spill(self):
+        """Write the sorted buffers out as one run per family and empty them"""
+        if self._v4:
+            keys = array('Q', self._v4)
+            if sys.byteorder == "little":
+                keys.byteswap()
+            f = spill_file(self._spill_dir)
+            keys.tofile(f)
+            f.flush()
+            self._runs[4].append(f)
+            self._run_unique[4] = None
+        if self._v6_prefix:
+            f = spill_file(self._spill_dir)
+            f.write(b"".join(itertools.starmap(_V6_RECORD.pack, zip(
+                self._v6_high, self._v6_low, self._v6_prefix, self._v6_source))))
+            f.flush()
+            self._runs[6].append(f)
+            self._run_unique[6] = None
+        self._v4 = array('Q')
+        self._v6_high, self._v6_low = array('Q'), array('Q')
+        self._v6_prefix, self._v6_source = array('B'), array('H')
+
+    def compact(self):
+        """Sort and deduplicate, merging any spilled runs into a single run per family"""
+        if not self._sorted:
+            self._sort_buffers()
+        runs = self._runs
+        if not (runs[4] or runs[6]):
+            return
+        if self._v4 or self._v6_prefix:
+            self._spill()
+        for version, width, address_width in ((4, 8, 6), (6, _V6_RECORD.size, 17)):
+            if len(runs[version]) < 2:
+                # A lone run is counted once, however it came to be the only one
+                if runs[version] and self._run_unique[version] is None:
+                    self._run_unique[version] = sum(1 for _ in itertools.groupby(
+                        read_run(runs[version][0], width), lambda record: record[:address_width]))
+                continue
+            unique = 0
+            merged = spill_file(self._spill_dir)
+            previous = None
+            for record in merge_runs(runs[version], width):
+                merged.write(record)
+                if record[:address_width] != previous:
+                    unique += 1
+                    previous = record[:address_width]
+            merged.flush()
+            for f in runs[version]:
+                f.close()
+            runs[version] = [merged]
+            self._run_unique[version] = unique
+        self._unique = sum(count or 0 for count in self._run_unique.values())
+
+    def _family(self, version):
+        """(network, prefix length, source) of every entry of one IP version, in order"""
+        runs = self._runs[version]
+        if version == 4:
+            if not runs:
+                return ((key >> 24, key >> 16 & 0xFF, key & 0xFFFF) for key in self._v4)
+            return ((key >> 24, key >> 16 & 0xFF, key & 0xFFFF)
+                    for key in (int.from_bytes(record, "big") for record in read_run(runs[0], 8)))
+        if not runs:
+            return ((high << 64 | low, length, source) for high, low, length, source in
+                    zip(self._v6_high, self._v6_low, self._v6_prefix, self._v6_source))
+        return ((high << 64 | low, length, source) for high, low, length, source in
+                (_V6_RECORD.unpack(record) for record in read_run(runs[0], _V6_RECORD.size)))
+
+    def __len__(self):
+        self.compact()
+        return self._unique
+
+    def networks(self):
+        """Yield (version, network, prefix length, source bitmap) per distinct entry, in order"""
+        self.compact()
+        families = ((4, self._family(4)), (6, self._family(6)))
+        for version, entries in families:
+            current = None
+            bitmap = 0
+            for network, length, source in entries:
+                if (network, length) != current:
+                    if current is not None:
+                        yield version, current[0], current[1], bitmap
+                    current = (network, length)
+                    bitmap = 0
+                bitmap |= 1 << source
+            if current is not None:
+                yield version, current[0], current[1], bitmap
+
+    def iter_sources(self):
+        """(address text, source bitmap) pairs in numeric order"""
+        ntoa = socket.inet_ntoa
+        for version, network, length, bitmap in self.networks():
+            if version == 4:
+                address = ntoa(network.to_bytes(4, "big"))
+                yield (address if length == 32 else f"{address}/{length}"), bitmap
+            else:
+                address = socket.inet_ntop(socket.AF_INET6, network.to_bytes(16, "big"))
+                yield (address if length == 128 else f"{address}/{length}"), bitmap
+
+    def __iter__(self):
+        """Addresses as text in numeric order, IPv4 before IPv6"""
+        for address, _ in self.iter_sources():
+            yield address
+
+    def ranges(self, versions=(4, 6)):
+        """Yield (version, first, last) address ranges with overlapping and adjacent ones merged"""
+        self.compact()
+        for version in versions:
+            bits = 32 if version == 4 else 128
+            # Entries are sorted by network address, so one linear sweep merges them
+            current = None
+            for network, length, _ in self._family(version):
+                first = network
+                last = network + (1 << (bits - length)) - 1
+                if current is None:
+                    current = [first, last]
+                elif first <= current[1] + 1:
+                    current[1] = max(current[1], last)
+                else:
+                    yield version, current[0], current[1]
+                    current = [first, last]
+            if current is not None:
+                yield version, current[0], current[1]
+
+    def collapsed(self):
+        """Minimal list of CIDRs covering every entry; hosts inside a listed range disappear"""
+        for version, first, last in self.ranges():
+            bits = 32 if version == 4 else 128
+            while first <= last:
+                # Largest block aligned on first that does not run past last
+                size = (first & -first).bit_length() - 1 if first else bits
+                size = min(size, (last - first + 1).bit_length() - 1)
+                if version == 4:
+                    address = socket.inet_ntoa(first.to_bytes(4, "big"))
+                else:
+                    address = socket.inet_ntop(socket.AF_INET6, first.to_bytes(16, "big"))
+                yield f"{address}/{bits - size}"
+                first += 1 << size
+
+    @property
+    def nbytes(self):
+        """Bytes held by the packed buffers"""
+        return sum(buf.itemsize * len(buf) for buf in
+                   (self._v4, self._v6_high, self._v6_low, self._v6_prefix, self._v6_source))
+
+
+def add_sourced(store, indicators, bit):
+    """OR a source bit into the bitmap of each indicator in a {indicator: bitmap} store"""
+    existing = store.keys() & indicators
+    # New indicators all share the same bit int object, so they cost a dict slot each
+    store.update(dict.fromkeys(indicators - existing, bit))
+    for indicator in existing:
+        store[indicator] |= bit
+
+
+class IndicatorStore:
+    """URLs or hashes mapped to the bitmap of the sources that reported them
+
+    Entries live in a dict until spill_limit of them have accumulated; the
+    dict is then written to a temporary file as a sorted run of
+    "indicator<TAB>hex bitmap" lines and emptied. compact() folds the runs
+    into one with a streaming k-way merge, OR-ing the bitmaps of an
+    indicator reported in several runs. Iteration is in sorted order either
+    way, so the feeds come out the same with or without spilling.
+    """
+
+    def __init__(self, spill_limit=None, spill_dir=None):
+        self._pending = {}
+        self._order = None
+        self._runs = []
+        self._count = 0
+        self._spill_limit = spill_limit
+        self._spill_dir = spill_dir
+
+    def update(self, indicators, bit):
+        """OR a source bit into every indicator of a set"""
+        add_sourced(self._pending, indicators, bit)
+        self._added()
+
+    def add(self, indicator, bitmap):
+        self._pending[indicator] = self._pending.get(indicator, 0) | bitmap
+        self._added()
+
+    def _added(self):
+        self._order = None
+        if self._spill_limit and len(self._pending) >= self._spill_limit:
+            self._spill()
+
+    def _spill(self):
+        pending = self._pending
+        f = spill_file(self._spill_dir)
+        f.writelines(f"{indicator}\t{pending[indicator]:x}\n".encode("utf-8") for indicator in sorted(pending))
+        f.flush()
+        if not self._runs:
+            # A first run is already merged: compact() leaves a lone run as it is
+            self._count = len(pending)
+        self._runs.append(f)
+        self._pending = {}
+
+    @staticmethod
+    def _read(f):
+        for line in read_run(f):
+            indicator, _, bitmap = line.decode("utf-8").rpartition("\t")
+            yield indicator, int(bitmap, 16)
+
+    def compact(self):
+        """Sort the entries, merging spilled runs into a single one"""
+        if not self._runs:
+            if self._order is None:
+                self._order = sorted(self._pending)
+            return
+        if not self._pending and len(self._runs) == 1:
+            return
+        if self._pending:
+            self._spill()
+        merged = spill_file(self._spill_dir)
+        count = 0
+        entries = heapq.merge(*(self._read(f) for f in self._runs), key=lambda entry: entry[0])
+        for indicator, group in itertools.groupby(entries, key=lambda entry: entry[0]):
+            bitmap = 0
+            for _, bits in group:
+                bitmap |= bits
+            merged.write(f"{indicator}\t{bitmap:x}\n".encode("utf-8"))
+            count += 1
+        merged.flush()
+        for f in self._runs:
+            f.close()
+        self._runs = [merged]
+        self._count = count
+
+    def items(self):
+        """(indicator, source bitmap) pairs in sorted order"""
+        self.compact()
+        if self._runs:
+            yield from self._read(self._runs[0])
+        else:
+            pending = self._pending
+            for indicator in self._order:
+                yield indicator, pending[indicator]
+
+    def __iter__(self):
+        for indicator, _ in self.items():
+            yield indicator
+
+    def __len__(self):
+        if not self._runs:
+            return len(self._pending)
+        self.compact()
+        return self._count
+
+
+def source_ids(bitmap):
+    """Source IDs set in a provenance bitmap, lowest first"""
+    ids = []
+    while bitmap:
+        low = bitmap & -bitmap
+        ids.append(low.bit_length() - 1)
+        bitmap ^= low
+    return ids
+
+
+class LifecycleStore:
+    """SQLite record of when each indicator was first and last seen, with per-type TTL expiry
+
+    One row per (feed type, indicator) holds first_seen, last_seen, the
+    number of runs that saw it and the source bitmap of its latest
+    sighting. The database runs in WAL mode and every run is upserted in
+    batched executemany calls inside a single transaction.
+    """
+
+    KINDS = {"ips": 0, "urls": 1, "hashes": 2}
+    BATCH_SIZE = 50000
+
+    def __init__(self, path, ttls=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Seconds an indicator is kept after it was last seen
+        self.ttls = {"ips": 24 * 3600, "urls": 72 * 3600, "hashes": 30 * 24 * 3600}
+        self.ttls.update(ttls or {})
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS indicators (
+                kind INTEGER NOT NULL,
+                value TEXT NOT NULL,
+                first_seen INTEGER NOT NULL,
+                last_seen INTEGER NOT NULL,
+                hits INTEGER NOT NULL,
+                sources BLOB,
+                PRIMARY KEY (kind, value)
+            ) WITHOUT ROWID
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS indicators_last_seen ON indicators (kind, last_seen)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _blob(bitmap):
+        return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+    def record(self, all_data, now):
+        """Upsert every indicator of a run; returns how many rows were written"""
+        rows = itertools.chain(
+            ((0, value, now, now, self._blob(bitmap)) for value, bitmap in all_data["ips"].iter_sources()),
+            ((1, value, now, now, self._blob(bitmap)) for value, bitmap in all_data["urls"].items()),
+            ((2, value, now, now, self._blob(bitmap)) for value, bitmap in all_data["hashes"].items())
+        )
+        written = 0
+        with self.db:
+            while True:
+                batch = list(itertools.islice(rows, self.BATCH_SIZE))
+                if not batch:
+                    break
+                self.db.executemany("""
+                    INSERT INTO indicators (kind, value, first_seen, last_seen, hits, sources)
+                    VALUES (?, ?, ?, ?, 1, ?)
+                    ON CONFLICT (kind, value) DO UPDATE SET
+                        last_seen = excluded.last_seen,
+                        hits = hits + 1,
+                        sources = excluded.sources
+                """, batch)
+                written += len(batch)
+        return written
+
+    def expire(self, now):
+        """Delete indicators not seen within their type's TTL; returns {feed_type: deleted}"""
+        deleted = {}
+        with self.db:
+            for feed_type, kind in self.KINDS.items():
+                cursor = self.db.execute("DELETE FROM indicators WHERE kind = ? AND last_seen < ?",
+                                         (kind, now - self.ttls[feed_type]))
+                deleted[feed_type] = cursor.rowcount
+        return deleted
+
+    def retained(self, now):
+        """Yield (feed_type, indicator, bitmap) for live indicators this run did not see"""
+        names = {kind: feed_type for feed_type, kind in self.KINDS.items()}
+        cursor = self.db.execute("SELECT kind, value, sources FROM indicators WHERE last_seen < ?", (now,))
+        for kind, value, sources in cursor:
+            yield names[kind], value, int.from_bytes(sources or b"", "little")
+
+    def lookup(self, feed_type, value):
+        """(first_seen, last_seen, hits) of an indicator, or None"""
+        return self.db.execute(
+            "SELECT first_seen, last_seen, hits FROM indicators WHERE kind = ? AND value = ?",
+            (self.KINDS[feed_type], value)
+        ).fetchone()
+
+
+class ProvenanceIndex:
+    """Reads the provenance sidecar: which sources listed an indicator, and how many agree"""
+
+    def __init__(self, path):
+        self.sources = []
+        self.bitmaps = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.startswith("# Source\t"):
+                    _, source_id, name, url = line.split("\t")
+                    self.sources.append((name, url))
+                elif line and not line.startswith('#'):
+                    indicator, ids = line.split("\t")
+                    bitmap = 0
+                    for source_id in ids.split(","):
+                        bitmap |= 1 << int(source_id)
+                    self.bitmaps[indicator] = bitmap
+
+    @staticmethod
+    def normalize(indicator):
+        """Match the canonical form written to the feeds"""
+        indicator = indicator.strip()
+        try:
+            network = ipaddress.ip_network(indicator, strict=False)
+        except ValueError:
+            pass
+        else:
+            address = network.network_address.compressed
+            return address if network.prefixlen == network.max_prefixlen else f"{address}/{network.prefixlen}"
+        return url_lookup_key(indicator)
+
+    def sources_for(self, indicator):
+        """(name, url) of every source that listed the indicator"""
+        bitmap = self.bitmaps.get(self.normalize(indicator), 0)
+        return [self.sources[source_id] for source_id in source_ids(bitmap)]
+
+    def agreement(self, indicator):
+        """Number of sources that listed the indicator"""
+        return bin(self.bitmaps.get(self.normalize(indicator), 0)).count("1")
+
+
+INDEX_MAGIC = b"AIDX"
+INDEX_VERSION = 1
+_INDEX_HEADER = struct.Struct("<4sHH")
+_INDEX_SECTION = struct.Struct("<8sHQQ")
+_HASH_SECTIONS = {32: b"md5", 40: b"sha1", 64: b"sha256"}
+
+
+def url_key(value):
+    """8-byte key of a URL or domain in the hashed URL index"""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+
+def write_index(path, sections):
+    """Write a fixed-width sorted binary index
+
+    sections is a list of (name, width, records) where records is an iterable
+    of width-byte big-endian records in ascending byte order. Layout: header
+    (magic, version, section count), one (name, width, count, offset) entry
+    per section, then each section's records back to back.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    table_size = _INDEX_HEADER.size + _INDEX_SECTION.size * len(sections)
+    entries = []
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\0" * table_size)
+        for name, width, records in sections:
+            offset = f.tell()
+            count = 0
+            for record in records:
+                f.write(record)
+                count += 1
+            entries.append(_INDEX_SECTION.pack(name, width, count, offset))
+        f.seek(0)
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(sections)))
+        f.write(b"".join(entries))
+    os.replace(tmp_path, path)
+
+
+class FeedIndex:
+    """Membership lookups against a binary index written by generate_feeds
+
+    The file is memory-mapped read-only and searched in place, so opening
+    it parses nothing but the section table and worker processes share
+    its pages through the page cache.
+    """
+
+    FENCE_STRIDE = 128
+
+    def __init__(self, path):
+        self._fences = {}
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} Argonis index")
+        self.sections = {}
+        for number in range(count):
+            name, width, records, offset = _INDEX_SECTION.unpack_from(
+                self._mm, _INDEX_HEADER.size + number * _INDEX_SECTION.size)
+            self.sections[name.rstrip(b"\0").decode()] = (width, records, offset)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _floor(self, section, key):
+        """Index of the last record whose leading bytes are <= key, or -1"""
+        width, count, offset = self.sections[section]
+        size = len(key)
+        mm = self._mm
+        # Every FENCE_STRIDE-th key, built on first use, narrows the search in C
+        fences = self._fences.get(section)
+        if fences is None:
+            fences = self._fences[section] = [
+                mm[start:start + size]
+                for start in range(offset, offset + count * width, width * self.FENCE_STRIDE)
+            ]
+        block = bisect.bisect_right(fences, key) - 1
+        if block < 0:
+            return -1
+        low = block * self.FENCE_STRIDE + 1
+        high = min(count, low - 1 + self.FENCE_STRIDE)
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + middle * width
+            if mm[start:start + size] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+    def _has(self, section, key):
+        if section not in self.sections:
+            return False
+        found = self._floor(section, key)
+        if found < 0:
+            return False
+        width, _, offset = self.sections[section]
+        start = offset + found * width
+        return self._mm[start:start + len(key)] == key
+
+    def contains_ip(self, value):
+        """True if the address (or whole CIDR) falls inside a listed range"""
+        value = value.strip()
+        if "/" in value:
+            network = ipaddress.ip_network(value, strict=False)
+            first = network.network_address.packed
+            last = network.broadcast_address.packed
+        else:
+            # Plain addresses skip ipaddress object construction
+            family = socket.AF_INET6 if ":" in value else socket.AF_INET
+            try:
+                first = last = socket.inet_pton(family, value)
+            except OSError:
+                raise ValueError(f"{value!r} is not an IP address or network")
+        size = len(first)
+        section = "ipv4" if size == 4 else "ipv6"
+        if section not in self.sections:
+            return False
+        found = self._floor(section, first)
+        if found < 0:
+            return False
+        width, _, offset = self.sections[section]
+        start = offset + found * width + size
+        return self._mm[start:start + size] >= last
+
+    def contains_hash(self, value):
+        value = value.strip().lower()
+        section = _HASH_SECTIONS.get(len(value))
+        try:
+            return section is not None and self._has(section.decode(), bytes.fromhex(value))
+        except ValueError:
+            return False
+
+    def contains_url(self, value):
+        return self._has("urlkey", url_key(url_lookup_key(value)))
+
+    def __contains__(self, value):
+        try:
+            ipaddress.ip_network(value.strip(), strict=False)
+        except ValueError:
+            pass
+        else:
+            return self.contains_ip(value)
+        if any(section.decode() in self.sections for section in _HASH_SECTIONS.values()):
+            return self.contains_hash(value)
+        return self.contains_url(value)
+
+
+FILTER_MAGIC = b"ABLM"
+FILTER_VERSION = 1
+_FILTER_HEADER = struct.Struct("<4sHH8sQQdH")
+_FILTER_MASK = (1 << 64) - 1
+
+
+def _filter_probes(key, hashes, bits):
+    """Bit positions of a key: Kirsch-Mitzenmacher double hashing over one BLAKE2b digest"""
+    digest = int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), "little")
+    first = digest & _FILTER_MASK
+    step = digest >> 64 | 1
+    return ((first + i * step) % bits for i in range(hashes))
+
+
+def ip_filter_key(version, network, length):
+    return network.to_bytes(4 if version == 4 else 16, "big") + bytes((length,))
+
+
+def url_filter_key(value):
+    return url_lookup_key(value).encode("utf-8")
+
+
+def write_filter(path, kind, keys, count, fp_rate, prefixes=()):
+    """Write a Bloom filter sized for count keys at the given false-positive rate
+
+    Layout: header (magic, version, hash count, kind, bit count, key count,
+    target rate, prefix count), one (IP version, prefix length) pair per
+    prefixes entry so readers know which masks to probe, then the bit array.
+    An IP lookup probes every prefix length of its version, so the table is
+    sized for fp_rate split across the most lengths any version has, and
+    fp_rate holds per lookup.
+
+    The table is rounded up to a power of two and the hash count depends only
+    on the target rate, so between runs that stay within one size step a
+    changed key flips only its own bits and the published file diffs small.
+    """
+    count = max(count, 1)
+    probes = max([sum(1 for prefix in prefixes if prefix[0] == version) for version in (4, 6)] + [1])
+    needed = -count * math.log(fp_rate / probes) / math.log(2) ** 2
+    bits = max(64, 1 << math.ceil(math.log2(needed)))
+    hashes = max(1, round(-math.log2(fp_rate / probes)))
+    table = bytearray(bits // 8)
+    for key in keys:
+        for bit in _filter_probes(key, hashes, bits):
+            table[bit >> 3] |= 1 << (bit & 7)
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(_FILTER_HEADER.pack(FILTER_MAGIC, FILTER_VERSION, hashes, kind,
+                                    bits, count, fp_rate, len(prefixes)))
+        f.write(b"".join(bytes(prefix) for prefix in prefixes))
+        f.write(table)
+    os.replace(tmp_path, path)
+    return len(table)
+
+
+class FeedFilter:
+    """Probabilistic pre-check against a Bloom filter written by generate_feeds
+
+    False means the indicator is certainly not in the feed; True means it
+    probably is and should be confirmed with FeedIndex. Probes test bits in
+    the loaded table in place and never copy it.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, hashes, kind, bits, count, fp_rate, prefix_count = \
+            _FILTER_HEADER.unpack_from(data, 0)
+        if magic != FILTER_MAGIC or version != FILTER_VERSION:
+            raise ValueError(f"{path} is not a version {FILTER_VERSION} Argonis filter")
+        self.kind = kind.rstrip(b"\0").decode()
+        self.hashes = hashes
+        self.bits = bits
+        self.count = count
+        self.fp_rate = fp_rate
+        start = _FILTER_HEADER.size
+        # Longest prefix first: host entries are by far the most common
+        self.prefixes = {4: [], 6: []}
+        for offset in range(start, start + prefix_count * 2, 2):
+            self.prefixes[data[offset]].append(data[offset + 1])
+        for lengths in self.prefixes.values():
+            lengths.sort(reverse=True)
+        self._table = memoryview(data)[start + prefix_count * 2:]
+
+    def _probe(self, key):
+        table = self._table
+        for bit in _filter_probes(key, self.hashes, self.bits):
+            if not table[bit >> 3] & 1 << (bit & 7):
+                return False
+        return True
+
+    def might_contain_ip(self, value):
+        """True if the address may fall inside any listed network"""
+        value = value.strip()
+        if "/" in value:
+            # Networks may overlap listed ranges only partially; leave it to FeedIndex
+            return True
+        family = socket.AF_INET6 if ":" in value else socket.AF_INET
+        try:
+            packed = socket.inet_pton(family, value)
+        except OSError:
+            return False
+        version, width = (4, 32) if family == socket.AF_INET else (6, 128)
+        address = int.from_bytes(packed, "big")
+        for length in self.prefixes[version]:
+            network = address >> (width - length) << (width - length)
+            if self._probe(ip_filter_key(version, network, length)):
+                return True
+        return False
+
+    def might_contain_hash(self, value):
+        try:
+            return self._probe(bytes.fromhex(value.strip()))
+        except ValueError:
+            return False
+
+    def might_contain_url(self, value):
+        return self._probe(url_filter_key(value))
+
+    def __contains__(self, value):
+        if self.kind == "ip":
+            return self.might_contain_ip(value)
+        if self.kind == "hash":
+            return self.might_contain_hash(value)
+        return self.might_contain_url(value)
+
+
+TRIE_MAGIC = b"ATRI"
+TRIE_VERSION = 1
+_TRIE_HEADER = struct.Struct("<4sHHII")
+
+
+def write_domain_trie(path, domains, spill_limit=None, spill_dir=None):
+    """Serialize listed domains as a reversed-label suffix trie
+
+    Nodes are numbered breadth-first, so the children of node i are the
+    sorted run first[i]..first[i + 1]. The file holds the header (magic,
+    version, node count, label blob size), the first-child offsets, each
+    node's label offset and label length (high bit set when the domain
+    itself is listed), all little-endian, then the deduplicated label blob.
+    Subdomains of a listed domain are dropped since the parent covers them.
+
+    The reversed names are kept sorted in an IndicatorStore, which spills
+    past spill_limit, and each depth of the trie is one pass over them.
+    """
+    # NUL sorts below every label character, so joined names sort like label tuples
+    names = IndicatorStore(spill_limit, spill_dir)
+    for host in map(normalize_host, domains):
+        if host:
+            names.add("\0".join(reversed(host.split("."))), 0)
+
+    def covered():
+        listed = None
+        for name in names:
+            # A listed ancestor sorts right before its subdomains
+            if listed is not None and name.startswith(listed):
+                continue
+            listed = name + "\0"
+            yield name.split("\0")
+
+    child_count = array('I', [0])
+    label_offset, label_length = array('I', [0]), array('B', [0])
+    labels = {}
+    blob = bytearray()
+    count = 0
+    level_start = 0
+    depth = 0
+    while True:
+        # Level depth holds the distinct depth-label prefixes in sorted order; their
+        # children are the distinct prefixes one label longer, grouped by parent
+        parent = level_start - 1
+        parent_prefix = child_prefix = None
+        next_level = len(child_count)
+        for name in covered():
+            if len(name) < depth:
+                continue
+            if depth == 0:
+                count += 1
+            if name[:depth] != parent_prefix:
+                parent_prefix = name[:depth]
+                parent += 1
+            if len(name) == depth or name[:depth + 1] == child_prefix:
+                continue
+            child_prefix = name[:depth + 1]
+            child_count[parent] += 1
+            label = name[depth].encode("ascii")
+            if label not in labels:
+                labels[label] = len(blob)
+                blob += label
+            child_count.append(0)
+            label_offset.append(labels[label])
+            # DNS labels are at most 63 bytes, leaving the high bit for the listed flag
+            label_length.append(len(label) | (0x80 if len(name) == depth + 1 else 0))
+        if next_level == len(child_count):
+            break
+        level_start = next_level
+        depth += 1
+
+    first_child = array('I', [1])
+    for children in child_count:
+        first_child.append(first_child[-1] + children)
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(_TRIE_HEADER.pack(TRIE_MAGIC, TRIE_VERSION, 0, len(child_count), len(blob)))
+        for values in (first_child, label_offset, label_length):
+            if sys.byteorder == "big":
+                values.byteswap()
+            values.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return count
+
+
+class DomainTrie:
+    """Answers "is this host or any parent domain listed" from a serialized suffix trie
+
+    Loading reads the node arrays straight into array objects, and a lookup
+    walks one node per label, binary searching among that node's children.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, _, nodes, blob_size = _TRIE_HEADER.unpack_from(data, 0)
+        if magic != TRIE_MAGIC or version != TRIE_VERSION:
+            raise ValueError(f"{path} is not a version {TRIE_VERSION} Argonis domain trie")
+        position = _TRIE_HEADER.size
+        arrays = []
+        for typecode, length in (("I", nodes + 1), ("I", nodes), ("B", nodes)):
+            values = array(typecode)
+            end = position + length * values.itemsize
+            values.frombytes(data[position:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+            position = end
+        self._first_child, self._label_offset, self._label_length = arrays
+        self._blob = data[position:position + blob_size]
+
+    def __len__(self):
+        return sum(length >> 7 for length in self._label_length)
+
+    def _label(self, node):
+        start = self._label_offset[node]
+        return self._blob[start:start + (self._label_length[node] & 0x7F)]
+
+    def match(self, host):
+        """The listed domain covering host, or None"""
+        host = normalize_host(host.strip())
+        if host is None:
+            return None
+        labels = host.split(".")
+        node = 0
+        for depth, label in enumerate(reversed(labels), 1):
+            label = label.encode("ascii")
+            low = self._first_child[node]
+            end = high = self._first_child[node + 1]
+            while low < high:
+                middle = (low + high) // 2
+                if self._label(middle) < label:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == end or self._label(low) != label:
+                return None
+            node = low
+            if self._label_length[node] & 0x80:
+                return ".".join(labels[-depth:])
+        return None
+
+    def __contains__(self, host):
+        return self.match(host) is not None
+
+
+def ip_sort_key(value):
+    """Sort key matching IPStore order: IPv4 before IPv6, then address, then prefix length
+
+    Raises ValueError for anything but a bare address or CIDR. inet_pton is
+    used for both families because inet_aton accepts trailing text, which
+    would let a legacy "ip<TAB>score" line pass for its address.
+    """
+    address, _, prefix = value.partition("/")
+    family, version, width = (socket.AF_INET6, 6, 128) if ":" in address else (socket.AF_INET, 4, 32)
+    try:
+        packed = socket.inet_pton(family, address)
+    except OSError:
+        raise ValueError(f"not an IP address: {value!r}") from None
+    if prefix and not (prefix.isdigit() and int(prefix) <= width):
+        raise ValueError(f"not a prefix length: {value!r}")
+    return version, int.from_bytes(packed, "big"), int(prefix or width)
+
+
+def read_feed(path):
+    """Yield the indicator lines of a feed file, skipping the comment header"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line and not line.startswith('#'):
+                yield line
+
+
+def read_snapshot(path, key=None):
+    """Read a feed once into (indicators in key order, lines key cannot parse)
+
+    Snapshots written by older versions may be in a different order or still
+    hold raw source lines (CSV rows, "ip<TAB>score"), which are set aside
+    instead of failing the whole diff.
+    """
+    if key is None:
+        lines = list(read_feed(path))
+        return (lines if is_sorted(lines) else sorted(set(lines))), []
+    lines, unparsed = [], []
+    for line in read_feed(path):
+        try:
+            key(line)
+        except ValueError:
+            unparsed.append(line)
+        else:
+            lines.append(line)
+    if not is_sorted(lines, key):
+        lines = sorted(set(lines), key=key)
+    return lines, unparsed
+
+
+def read_sequence(path):
+    """Sequence number from a feed file's header, 0 if it has none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.startswith('#'):
+                    break
+                if line.startswith("# Sequence:"):
+                    return int(line.split(":", 1)[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def diff_sorted(old, new, key=None):
+    """Linear merge of two sorted, deduplicated streams into ('+', x) / ('-', x) changes"""
+    key = key or (lambda value: value)
+    old, new = iter(old), iter(new)
+    a, b = next(old, None), next(new, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and key(a) < key(b)):
+            yield "-", a
+            a = next(old, None)
+        elif a is None or key(b) < key(a):
+            yield "+", b
+            b = next(new, None)
+        else:
+            a, b = next(old, None), next(new, None)
+
+
+def is_sorted(values, key=None):
+    """True if values are strictly increasing under key"""
+    key = key or (lambda value: value)
+    previous = None
+    for value in values:
+        current = key(value)
+        if previous is not None and current <= previous:
+            return False
+        previous = current
+    return True
+
+
+SHARD_MANIFEST = "argonisintel_Shard_Manifest.json"
+SHARD_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def ip_shard(value):
+    """Shard of an IP feed line: its IPv4 /8 or IPv6 /16"""
+    if ":" not in value:
+        return f"ipv4-{int(value.split('.', 1)[0]):03d}"
+    first = value.split(":", 1)[0]
+    return f"ipv6-{int(first or '0', 16):04x}"
+
+
+def hash_shard(value, prefix=2):
+    """Shard of a hash: its algorithm and first hex digits"""
+    algorithm = _HASH_SECTIONS.get(len(value), b"hash").decode()
+    return f"{algorithm}-{value[:prefix]}"
+
+
+def url_shard(value, prefix=2):
+    """Shard of a URL or domain: the first hex digits of its url_key, spreading hosts evenly"""
+    return f"url-{url_key(value).hex()[:prefix]}"
+
+
+def compress_shard(src, dst, compression):
+    """Compress a file deterministically, so unchanged content gives identical bytes"""
+    with open(src, 'rb') as plain, open(dst, 'wb') as raw:
+        if compression == "zstd":
+            zstandard.ZstdCompressor(level=19).copy_stream(plain, raw)
+        else:
+            with gzip.GzipFile(filename="", mode='wb', fileobj=raw, mtime=0) as compressed:
+                for chunk in read_chunks(plain):
+                    compressed.write(chunk)
+
+
+def decompress_shard(data, compression):
+    """Uncompressed bytes of a downloaded shard"""
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd shards need the zstandard package")
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            return reader.read()
+    return gzip.decompress(data)
+
+
+def sync_shards(source, directory=".", only=None, workers=8):
+    """Mirror published feed shards into directory, fetching only shards that changed
+
+    source is the directory or base URL holding the shard manifest. Shard
+    files are named after their content digest, so a file already present
+    locally is current; missing ones are fetched in parallel and verified
+    against the manifest. only is a list of shard name patterns such as
+    "sha256-*" or "ipv4-010". Returns (fetched, kept, removed, bytes fetched).
+    """
+    directory = Path(directory)
+    remote = str(source).startswith(("http://", "https://"))
+    # Each fetch thread gets its own session; all of them share one keep-alive pool
+    adapter = PooledAdapter(pool_size=max(1, workers))
+    sessions = threading.local()
+
+    def read(name):
+        if remote:
+            session = getattr(sessions, "session", None)
+            if session is None:
+                session = sessions.session = pooled_session(adapter)
+            response = session.get(f"{str(source).rstrip('/')}/{name}", timeout=60)
+            response.raise_for_status()
+            return response.content
+        return (Path(source) / name).read_bytes()
+
+    manifest_bytes = read(SHARD_MANIFEST)
+    manifest = json.loads(manifest_bytes)
+    wanted = [
+        entry for feed in manifest["feeds"].values() for entry in feed["shards"]
+        if not only or any(fnmatch.fnmatch(entry["shard"], pattern) for pattern in only)
+    ]
+    missing = [entry for entry in wanted if not (directory / entry["file"]).exists()]
+
+    def fetch(entry):
+        data = read(entry["file"])
+        if hashlib.sha256(decompress_shard(data, manifest["compression"])).hexdigest() != entry["sha256"]:
+            raise ValueError(f"{entry['file']}: content does not match the manifest digest")
+        target = directory / entry["file"]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(target.name + ".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, target)
+        return len(data)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            fetched_bytes = sum(executor.map(fetch, missing))
+    finally:
+        adapter.close()
+
+    # Shards no longer listed (or no longer wanted) are dropped
+    keep = {directory / entry["file"] for entry in wanted}
+    removed = 0
+    for path in (directory / "shards").glob("*"):
+        if path not in keep:
+            path.unlink()
+            removed += 1
+    (directory / SHARD_MANIFEST).write_bytes(manifest_bytes)
+    return len(missing), len(wanted) - len(missing), removed, fetched_bytes
+
+
+MATCH_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Per-process state of match workers, set up once by _match_worker_init
+_match_state = {}
+
+
+def match_chunks(path, chunk_size=MATCH_CHUNK_SIZE):
+    """Split a file into (start, end) byte ranges that end on line boundaries"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def _url_host(url):
+    """Lowercase host of a URL, cheaper than urlsplit on the hot path"""
+    netloc = url.split("://", 1)[1]
+    for separator in "/?#":
+        netloc = netloc.split(separator, 1)[0]
+    host = netloc.rsplit("@", 1)[-1]
+    if host.startswith("["):
+        return host[1:].split("]", 1)[0].lower()
+    return host.split(":", 1)[0].lower()
+
+
+def _match_worker_init(index_dir):
+    directory = Path(index_dir)
+    _match_state["seen"] = {}
+    _match_state["classifier"] = IndicatorClassifier()
+    # The indexes are memory-mapped, so every worker shares the same pages
+    _match_state["indexes"] = {
+        feed_type: FeedIndex(directory / f"argonisintel_{feed}_Feed.idx")
+        for feed_type, feed in (("ips", "IP"), ("urls", "URL"), ("hashes", "Hash"))
+    }
+    trie = directory / "argonisintel_URL_Feed.trie"
+    _match_state["trie"] = DomainTrie(trie) if trie.exists() else None
+
+
+def _match_chunk(task):
+    """Hits in one byte range: (newlines in the chunk, [(offset, line index, feed_type, indicator)])"""
+    path, start, end = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        # latin-1 maps bytes 1:1 to characters, so string offsets are byte offsets
+        text = f.read(end - start).decode("latin-1")
+    indexes = _match_state["indexes"]
+    checks = {
+        "ips": indexes["ips"].contains_ip,
+        "urls": indexes["urls"].contains_url,
+        "hashes": indexes["hashes"].contains_hash
+    }
+    # Logs repeat the same few indicators, so answers are memoized per worker
+    seen = _match_state["seen"]
+    trie = _match_state["trie"]
+    if len(seen) > 1000000:
+        seen.clear()
+    hits = []
+    line_number = 0
+    position = 0
+    for offset, feed_type, value in _match_state["classifier"].scan(text):
+        listed = seen.get(value)
+        if listed is None:
+            listed = checks[feed_type](value)
+            if not listed and feed_type == "urls":
+                # A listed domain flags every URL on it and, via the trie, every subdomain
+                host = _url_host(value) if "://" in value else None
+                if trie is not None:
+                    listed = trie.match(host or value) is not None
+                elif host:
+                    listed = checks["urls"](host)
+            seen[value] = listed
+        if listed:
+            line_start = text.rfind("\n", 0, offset) + 1
+            line_number += text.count("\n", position, line_start)
+            position = line_start
+            hits.append((start + line_start, line_number, feed_type, value))
+    return text.count("\n"), hits
+
+
+def match_log(path, index_dir=".", workers=None, chunk_size=MATCH_CHUNK_SIZE):
+    """Yield (byte offset, line number, feed_type, indicator) for listed indicators in a log
+
+    Works on plain-text, CSV and JSONL logs alike, since the classifier's
+    delimiters include quotes, commas and colons. The file is split into
+    line-aligned chunks that a process pool scans in parallel; hits come
+    back in file order with 1-based line numbers.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = ((path, start, end) for start, end in match_chunks(path, chunk_size))
+    lines_before = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_match_worker_init, initargs=(str(index_dir),)
+    ) as executor:
+        for newlines, hits in executor.map(_match_chunk, tasks):
+            for offset, line_index, feed_type, value in hits:
+                yield offset, lines_before + line_index + 1, feed_type, value
+            lines_before += newlines
+
+
+PARSE_CHUNK_LINES = 50000
+
+# Per-process state of parse workers, set up once by _parse_worker_init
+_parse_state = {}
+
+
+def _parse_worker_init():
+    _parse_state["classifier"] = IndicatorClassifier()
+
+
+def _parse_chunk(task):
+    """Classify one line-aligned chunk of a body into compact per-type results
+
+    Returns (IPStore of sorted packed addresses, newline-joined URLs,
+    newline-joined hashes, lines with indicators, indicators, CPU seconds).
+    One packed array and two strings pickle far smaller and faster than
+    sets of strings.
+    """
+    text, hint, routes, source = task
+    start = time.process_time()
+    found, matched = _parse_state["classifier"].classify(text.split("\n"), hint)
+    ips = IPStore()
+    if "ips" in routes:
+        ips.update(found["ips"], source)
+        ips.compact()
+    urls = "\n".join(found["urls"]) if "urls" in routes else ""
+    hashes = "\n".join(found["hashes"]) if "hashes" in routes else ""
+    indicators = sum(len(found[feed_type]) for feed_type in routes)
+    return ips, urls, hashes, matched, indicators, time.process_time() - start
+
 
 class ThreatIntelCollector:
-    def __init__(self):
+    def __init__(self, max_workers=16, per_host_limit=4, cache_dir=".argonisintel_cache",
+                 write_cidr_feed=False, write_deltas=True, delta_retention=168,
+                 write_provenance=True, write_index=True, write_filters=True, filter_fp_rate=0.001,
+                 metrics_dir=".", retries=2, connect_timeout=10, read_timeout=30,
+                 deadline=None, breaker_threshold=3, breaker_cooldown=6 * 3600,
+                 adaptive_refresh=True, max_refresh_interval=24 * 3600, lifecycle=True, ttls=None,
+                 spill_threshold=None, spill_dir=None, parse_processes=1,
+                 write_shards=False, shard_compression="gzip", shard_prefix=2, pool_size=None):
         self.data_dir = Path(".")
+
+        # Content-addressed compressed shards under shards/ plus a manifest, so clients
+        # fetch only what changed; shard_prefix hex digits split the URL and hash feeds
+        self.write_shards = write_shards
+        self.shard_compression = shard_compression
+        self.shard_prefix = shard_prefix
+
+        # Process pool for classifying large bodies (None or 0: one process per core);
+        # 1 parses on the fetch threads
+        self.parse_processes = parse_processes or os.cpu_count() or 1
+        self._parse_pool = None
+
+        # Bounded-memory mode: past spill_threshold indicators per feed type, sorted
+        # runs go to temporary files in spill_dir and are merged when the feeds are written
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+
+        # SQLite first/last-seen store in the cache dir; indicators missing from a run
+        # stay in the feeds until their type's TTL (seconds, {feed_type: ttl}) runs out
+        self.lifecycle_path = Path(cache_dir) / "lifecycle.db" if cache_dir and lifecycle else None
+        self.ttls = ttls
+
+        # Per-source refresh intervals learned from content changes; needs the
+        # cache, which holds the snapshot served between fetches
+        self.schedule = RefreshSchedule(Path(cache_dir) / "schedule.json", max_interval=max_refresh_interval) \
+            if cache_dir and adaptive_refresh else None
+
+        # Failure handling: retries with jittered backoff, (connect, read) timeouts,
+        # a run deadline in seconds, and a circuit breaker persisted in the cache dir
+        self.retries = max(0, retries)
+        self.timeout = (connect_timeout, read_timeout)
+        self.deadline = deadline
+        self._deadline_at = None
+        self.breaker = CircuitBreaker(Path(cache_dir) / "breaker.json" if cache_dir else None,
+                                      breaker_threshold, breaker_cooldown)
+
+        # Run report (JSON) and Prometheus textfile with per-source and per-phase metrics
+        self.metrics_dir = metrics_dir
+        self.source_metrics = {}
+        self.phase_seconds = {}
+
+        # Bloom filter pre-checks (argonisintel_*_Feed.bloom) for memory-constrained consumers
+        self.write_filters = write_filters
+        self.filter_fp_rate = filter_fp_rate
+
+        # Memory-mappable argonisintel_*_Feed.idx lookup files
+        self.write_index = write_index
+
+        # Per-indicator source bitmaps exported to argonisintel_Provenance.tsv
+        self.write_provenance = write_provenance
+        self.sources = []
+
+        # Added/removed files against the previous snapshot, kept for delta_retention runs
+        self.write_deltas = write_deltas
+        self.delta_retention = delta_retention
+
+        # Also write argonisintel_IP_CIDR_Feed.txt with ranges collapsed
+        self.write_cidr_feed = write_cidr_feed
+
+        # Conditional-GET response cache (None disables it)
+        self.cache = FeedCache(cache_dir) if cache_dir else None
+        self.cache_stats = {"fetched": 0, "cached": 0, "deferred": 0, "bytes_saved": 0}
+        self._stats_lock = threading.Lock()
+
+        # Fetch concurrency: global worker limit and per-host cap
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+        # Keep-alive connections kept open per host (None: per_host_limit), shared by
+        # the per-thread sessions of all fetch workers
+        self.pool_size = pool_size or self.per_host_limit
+        self._adapter = None
+        self._sessions = threading.local()
         
         # Updated C2 Intel Feeds URLs
         self.c2_feeds = {
@@ -143,118 +2192,1138 @@ class ThreatIntelCollector:
             ]
         }
 
+        # Column hints for sources whose other columns hold unrelated indicators
+        # (reporter links, malware family names, sinkhole addresses)
+        self.source_hints = {
+            "https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/today.csv": {"delimiter": ",", "column": 3},
+            "https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/week.csv": {"delimiter": ",", "column": 3},
+            "https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/month.csv": {"delimiter": ",", "column": 3},
+            "https://raw.githubusercontent.com/0xDanielLopez/TweetFeed/master/year.csv": {"delimiter": ",", "column": 3},
+            "https://urlhaus.abuse.ch/downloads/csv_recent/": {"delimiter": ",", "column": 2},
+            "https://threatfox.abuse.ch/export/csv/urls/recent/": {"delimiter": ",", "column": 2},
+            "https://threatfox.abuse.ch/export/csv/md5/recent/": {"delimiter": ",", "column": 2},
+            "https://threatfox.abuse.ch/export/csv/sha256/recent/": {"delimiter": ",", "column": 2},
+            "https://threatfox.abuse.ch/downloads/hostfile/": {"delimiter": None, "column": 1},
+            "https://hole.cert.pl/domains/domains.csv": {"delimiter": "\t", "column": 1},
+            "https://www.botvrij.eu/data/blocklist/blocklist_domain.csv": {"delimiter": ",", "column": 0}
+        }
+        self.classifier = IndicatorClassifier()
+        self.parse_stats = {"lines": 0, "indicators": 0, "rejected": 0, "seconds": 0.0}
+
+
+    def _source_metrics(self, url):
+        """The metrics dict of a source URL, created on first use"""
+        with self._stats_lock:
+            return self.source_metrics.setdefault(url, {
+                "http_status": None, "error": None, "cached": False, "ttfb_seconds": None,
+                "requests": 0, "connections": 0, "handshake_seconds": 0.0, "wire_bytes": 0,
+                "stream_seconds": 0.0, "parse_seconds": 0.0, "bytes": 0,
+                "lines": 0, "indicators": 0, "rejected": 0
+            })
 
     def fetch_feed(self, url, feed_name):
-        """Fetch data from a feed URL with error handling"""
+        """Stream the lines of a feed URL with retries, circuit breaking and a last-good fallback"""
+        metrics = self._source_metrics(url)
+        if self.breaker.is_open(url):
+            print(f"Skipping {feed_name}: failed {self.breaker.failures(url)} runs in a row, cooling down")
+            metrics["skipped"] = "circuit open"
+            yield from self._last_good_copy(url, feed_name)
+            return
+        
+        # Sources that rarely change are served from their snapshot until due
+        if self.schedule and not self.schedule.is_due(url):
+            cached = self.cache.open(url)
+            if cached is not None:
+                chunks, size, encoding = cached
+                metrics["deferred"] = True
+                metrics["bytes"] = size
+                with self._stats_lock:
+                    self.cache_stats["deferred"] += 1
+                    self.cache_stats["bytes_saved"] += size
+                yield from iter_lines(chunks, encoding)
+                return
+            self.schedule.forget(url)
+        
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for line in self._stream_feed(url):
+                    started = True
+                    yield line
+                self.breaker.record(url, True)
+                return
+            except Exception as e:
+                error = e
+            
+            # Only failures before the body starts are retried, so no line is parsed twice
+            delay = random.uniform(0.5, 1.0) * min(30.0, 2.0 ** attempt)
+            if started or attempt >= self.retries or not self._retryable(error) or self._remaining() < delay:
+                break
+            attempt += 1
+            print(f"Retrying {feed_name} in {delay:.1f}s after {type(error).__name__} (attempt {attempt + 1})")
+            time.sleep(delay)
+        
+        metrics["error"] = type(error).__name__
+        metrics["attempts"] = attempt + 1
+        print(f"Error fetching {feed_name} ({url}): {error}")
+        # Running out of run time is not the source's fault
+        if not isinstance(error, DeadlineExceeded):
+            self.breaker.record(url, False)
+        yield from self._last_good_copy(url, feed_name)
+
+    @staticmethod
+    def _retryable(error):
+        """Connection problems, timeouts, 429 and 5xx are worth another try"""
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else 0
+            return status == 429 or status >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _remaining(self):
+        """Seconds left before the run deadline (infinite without one)"""
+        if self._deadline_at is None:
+            return float("inf")
+        return self._deadline_at - time.monotonic()
+
+    def _request_timeout(self):
+        """(connect, read) timeout, with connecting capped by the run deadline"""
+        remaining = self._remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("run deadline reached before the request")
+        connect, read = self.timeout
+        return min(connect, remaining), read
+
+    def _last_good_copy(self, url, feed_name):
+        """Yield the last complete body of a failed source so its indicators don't vanish"""
+        cached = self.cache.open(url) if self.cache else None
+        if cached is None:
+            return
+        chunks, size, encoding = cached
+        print(f"Serving last good copy of {feed_name} ({format_bytes(size)})")
+        self._source_metrics(url)["stale"] = True
+        yield from iter_lines(chunks, encoding)
+
+    def _session(self):
+        """This thread's requests session, on the collector's shared connection pools"""
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            with self._host_slots_lock:
+                if self._adapter is None:
+                    self._adapter = PooledAdapter(self.pool_size)
+            session = self._sessions.session = pooled_session(self._adapter)
+        return session
+
+    def _get(self, url, headers):
+        """Streamed GET on a pooled connection, charging any new connection to the source"""
+        metrics = self._source_metrics(url)
+        metrics["requests"] += 1
+        _connection_metrics.current = metrics
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
+            return self._session().get(url, headers=headers, timeout=self._request_timeout(), stream=True)
+        finally:
+            _connection_metrics.current = None
+
+    @staticmethod
+    def _release(response, metrics):
+        """Close a response, counting its wire bytes; bodyless ones keep their connection alive"""
+        metrics["wire_bytes"] += response.raw.tell()
+        if response.status_code == 304 or response.headers.get("Content-Length") == "0":
+            # Reading the empty body hands the connection back to the pool instead of closing it
+            response.raw.drain_conn()
+        response.close()
+
+    def close_connections(self):
+        """Close the keep-alive connections left open by the last run"""
+        with self._host_slots_lock:
+            if self._adapter is not None:
+                self._adapter.close()
+                self._adapter = None
+        self._sessions = threading.local()
+
+    def _stream_feed(self, url):
+        """Yield a feed's lines as its body arrives, revalidating against the cache"""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            # Bodies are decoded as they stream in; wire_bytes counts what was transferred
+            'Accept-Encoding': 'gzip, deflate'
+        }
+        if self.cache:
+            headers.update(self.cache.conditional_headers(url))
+        metrics = self._source_metrics(url)
+        started = time.perf_counter()
+        response = self._get(url, headers)
+        metrics["ttfb_seconds"] = round(time.perf_counter() - started, 4)
+        metrics["http_status"] = response.status_code
+        writer = None
+        digest = hashlib.sha256()
+
+        def counted(chunks):
+            for chunk in chunks:
+                metrics["bytes"] += len(chunk)
+                digest.update(chunk)
+                if self._remaining() <= 0:
+                    raise DeadlineExceeded("run deadline reached mid-download")
+                yield chunk
+
+        try:
+            # Not modified: reuse the cached body instead of downloading it again
+            if response.status_code == 304 and self.cache:
+                cached = self.cache.open(url)
+                if cached is not None:
+                    chunks, size, encoding = cached
+                    with self._stats_lock:
+                        self.cache_stats["cached"] += 1
+                        self.cache_stats["bytes_saved"] += size
+                    metrics["cached"] = True
+                    yield from iter_lines(counted(chunks), encoding)
+                    if self.schedule:
+                        self.schedule.observe(url, None)
+                    return
+                self._release(response, metrics)
+                headers.pop("If-None-Match", None)
+                headers.pop("If-Modified-Since", None)
+                response = self._get(url, headers)
+                metrics["http_status"] = response.status_code
+
             response.raise_for_status()
-            return response.text.splitlines()
-        except Exception as e:
-            print(f"Error fetching {feed_name} ({url}): {e}")
-            return []
-
-    def parse_c2_feed(self, lines):
-        """Parse C2 feed data"""
-        data = {
-            "urls": set(),
-            "ips": set(),
-            "hashes": set()
+            chunks = counted(response.iter_content(chunk_size=CHUNK_SIZE))
+            writer = self.cache.writer(url, response) if self.cache else None
+            if writer:
+                chunks = writer.tee(chunks)
+            yield from iter_lines(chunks, response.encoding or "utf-8")
+            if writer:
+                writer.commit()
+                writer = None
+            if self.schedule:
+                self.schedule.observe(url, digest.hexdigest())
+            with self._stats_lock:
+                self.cache_stats["fetched"] += 1
+        finally:
+            if writer:
+                writer.discard()
+            self._release(response, metrics)
+            metrics["stream_seconds"] = time.perf_counter() - started
+
+    def _host_slot(self, url):
+        """Return the semaphore limiting concurrent requests to the URL's host"""
+        host = urlsplit(url).netloc.lower()
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _fetch_limited(self, index, url, feed_name, consume):
+        """Fetch and consume a feed while holding one of its host's concurrency slots"""
+        with self._host_slot(url):
+            return consume(index, self.fetch_feed(url, feed_name))
+
+    def fetch_all(self, jobs, consume=lambda index, lines: list(lines)):
+        """Fetch (url, feed_name) jobs concurrently and return the results in job order
+
+        consume(index, lines) runs inside the worker while the body streams in;
+        by default the lines are collected into a list.
+        """
+        results = [None] * len(jobs)
+        if self.max_workers == 1:
+            for index, (url, feed_name) in enumerate(jobs):
+                results[index] = consume(index, self.fetch_feed(url, feed_name))
+            return results
+
+        # Interleave submissions across hosts so that workers waiting on a
+        # busy host's slot don't starve requests to other hosts
+        by_host = {}
+        for index, (url, _) in enumerate(jobs):
+            by_host.setdefault(urlsplit(url).netloc.lower(), []).append(index)
+        queues = list(by_host.values())
+        order = []
+        while queues:
+            order.extend(queue.pop(0) for queue in queues)
+            queues = [queue for queue in queues if queue]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_limited, index, *jobs[index], consume): index
+                for index in order
+            }
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    def plan_sources(self):
+        """Collapse the source table into unique URLs and the routes fed by each one
+
+        Returns {url: {"name", "url", "c2", "categories", "hint"}} in order of first
+        appearance. "c2" marks URLs that feed every indicator type and
+        "categories" lists the base feed types that subscribed to the URL.
+        """
+        plan = {}
+        for feed_name, url in self.c2_feeds.items():
+            source = plan.setdefault(url, {"name": feed_name, "c2": False, "categories": []})
+            source["c2"] = True
+        for feed_type, urls in self.base_feeds.items():
+            for url in urls:
+                source = plan.setdefault(url, {"name": f"base-{feed_type}", "c2": False, "categories": []})
+                if feed_type not in source["categories"]:
+                    source["categories"].append(feed_type)
+        for url, source in plan.items():
+            source["url"] = url
+            source["hint"] = self.source_hints.get(url)
+        return plan
+
+    def parse_source(self, lines, source, batch_size=10000, source_id=0):
+        """Classify a planned source's lines and route them to every subscribed feed type
+
+        Yields {feed_type: set} batches every batch_size lines so callers can
+        insert indicators while the body is still streaming in. With a parse
+        pool, a body longer than one batch is large: the rest of it goes to
+        the pool and its IPs come back as an IPStore tagged with source_id.
+        """
+        if source["c2"]:
+            routes = ("ips", "urls", "hashes")
+        else:
+            routes = source["categories"]
+        metrics = self._source_metrics(source["url"])
+        lines = iter(lines)
+        first_batch = True
+        while True:
+            chunk = list(itertools.islice(lines, batch_size))
+            if not chunk:
+                return
+            metrics["lines"] += len(chunk)
+            start = time.perf_counter()
+            batch = [line for line in chunk if line and not line.startswith('#')]
+            
+            # Error pages and repository front pages are not feeds
+            if first_batch:
+                first_batch = False
+                head = next((line.lstrip().lower() for line in batch if line.strip()), "")
+                if head.startswith(("<!doctype html", "<html")):
+                    print(f"Skipping {source['name']}: source returned an HTML page")
+                    metrics["skipped"] = "html page"
+                    return
+            if not batch:
+                continue
+            
+            found, matched = self.classifier.classify(batch, source["hint"])
+            data = {feed_type: found[feed_type] if feed_type in routes else set() for feed_type in found}
+            indicators = sum(len(found_set) for found_set in data.values())
+            seconds = time.perf_counter() - start
+            with self._stats_lock:
+                self.parse_stats["lines"] += len(batch)
+                self.parse_stats["rejected"] += len(batch) - matched
+                self.parse_stats["indicators"] += indicators
+                self.parse_stats["seconds"] += seconds
+            metrics["rejected"] += len(batch) - matched
+            metrics["indicators"] += indicators
+            metrics["parse_seconds"] += seconds
+            yield data
+            if self._parse_pool:
+                yield from self._parse_pooled(lines, source, routes, source_id, metrics)
+                return
+
+    def _parse_pooled(self, lines, source, routes, source_id, metrics):
+        """Classify the rest of a body in PARSE_CHUNK_LINES chunks across the parse pool
+
+        A bounded window of chunks is in flight per body, and results are
+        yielded in submission order.
+        """
+        pending = deque()
+        while True:
+            chunk = list(itertools.islice(lines, PARSE_CHUNK_LINES))
+            if chunk:
+                metrics["lines"] += len(chunk)
+                batch = [line for line in chunk if line and not line.startswith('#')]
+                if batch:
+                    task = ("\n".join(batch), source["hint"], routes, source_id)
+                    pending.append((len(batch), self._parse_pool.submit(_parse_chunk, task)))
+            if not pending:
+                if chunk:
+                    continue
+                return
+            if chunk and len(pending) < 2 * self.parse_processes:
+                continue
+            count, future = pending.popleft()
+            ips, urls, hashes, matched, indicators, seconds = future.result()
+            with self._stats_lock:
+                self.parse_stats["lines"] += count
+                self.parse_stats["rejected"] += count - matched
+                self.parse_stats["indicators"] += indicators
+                self.parse_stats["seconds"] += seconds
+            metrics["rejected"] += count - matched
+            metrics["indicators"] += indicators
+            metrics["parse_seconds"] += seconds
+            yield {
+                "ips": ips,
+                "urls": set(urls.split("\n")) if urls else set(),
+                "hashes": set(hashes.split("\n")) if hashes else set()
+            }
+
+    def new_stores(self):
+        """Empty per-feed-type stores, spilling to disk in bounded-memory mode"""
+        # URLs and hashes map to a bitmap of the source IDs that reported them
+        return {
+            "ips": IPStore(spill_limit=self.spill_threshold, spill_dir=self.spill_dir),
+            "urls": IndicatorStore(self.spill_threshold, self.spill_dir),
+            "hashes": IndicatorStore(self.spill_threshold, self.spill_dir)
         }
-        
-        for line in lines:
-            if line and not line.startswith('#'):
-                parts = line.strip().split(',')
-                if len(parts) >= 1:
-                    # Clean and validate URL
-                    url = parts[0].strip()
-                    if url.startswith(('http://', 'https://')):
-                        data["urls"].add(url)
-                    
-                    # Extract IP if present
-                    if len(parts) >= 2 and parts[1]:
-                        ip = parts[1].strip()
-                        # Basic IP validation
-                        if all(x.isdigit() and 0 <= int(x) <= 255 for x in ip.split('.')):
-                            data["ips"].add(ip)
-                    
-                    # Extract hash if present
-                    if len(parts) >= 3:
-                        hash_value = parts[2].strip()
-                        if len(hash_value) in [32, 40, 64]:  # MD5, SHA1, or SHA256
-                            data["hashes"].add(hash_value)
-        
-        return data
 
     def collect_feeds(self):
         """Collect all feed data"""
-        all_data = {
-            "ips": set(),
-            "urls": set(),
-            "hashes": set()
-        }
+        all_data = self.new_stores()
+        store_lock = threading.Lock()
         
-        # Collect from C2 feeds
-        for feed_name, feed_url in self.c2_feeds.items():
-            lines = self.fetch_feed(feed_url, feed_name)
-            c2_data = self.parse_c2_feed(lines)
-            all_data["ips"].update(c2_data["ips"])
-            all_data["urls"].update(c2_data["urls"])
-            all_data["hashes"].update(c2_data["hashes"])
+        # Fetch every unique URL once, concurrently
+        plan = self.plan_sources()
+        sources = list(plan.values())
+        # A source's ID is its position in the plan
+        self.sources = [(source["name"], url) for url, source in plan.items()]
+        entries = len(self.c2_feeds) + sum(len(urls) for urls in self.base_feeds.values())
+        print(f"Fetching {len(plan)} unique sources ({entries} source table entries)...")
         
-        # Collect from base feeds
-        for feed_type, urls in self.base_feeds.items():
-            for url in urls:
-                lines = self.fetch_feed(url, f"base-{feed_type}")
-                for line in lines:
-                    if line and not line.startswith('#'):
-                        all_data[feed_type].add(line.strip())
+        # Stream each body through the parser into stores of its own, merged into
+        # the shared ones only once the whole body has parsed
+        def insert(index, lines):
+            bit = 1 << index
+            staged = self.new_stores()
+            for batch in self.parse_source(lines, sources[index], source_id=index):
+                staged["ips"].update(batch["ips"], index)
+                staged["urls"].update(batch["urls"], bit)
+                staged["hashes"].update(batch["hashes"], bit)
+            with store_lock:
+                all_data["ips"].update(staged["ips"])
+                for feed_type in ("urls", "hashes"):
+                    for indicator, bitmap in staged[feed_type].items():
+                        all_data[feed_type].add(indicator, bitmap)
+        
+        def consume(index, lines):
+            source = sources[index]
+            try:
+                insert(index, lines)
+            except Exception as e:
+                # One malformed body falls back to the source's last good copy;
+                # nothing of the failed body reached the stores
+                print(f"Error parsing {source['name']} ({source['url']}): {e}")
+                metrics = self._source_metrics(source["url"])
+                metrics["error"] = type(e).__name__
+                metrics.update(lines=0, indicators=0, rejected=0)
+                try:
+                    insert(index, self._last_good_copy(source["url"], source["name"]))
+                except Exception as e:
+                    print(f"Error parsing last good copy of {source['name']}: {e}")
         
+        if self.parse_processes > 1:
+            self._parse_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.parse_processes, initializer=_parse_worker_init
+            )
+            # Start the workers now, before the fetch threads exist to be forked mid-operation
+            self._parse_pool.submit(int).result()
+        if self.deadline:
+            self._deadline_at = time.monotonic() + self.deadline
+        try:
+            self.fetch_all([(url, source["name"]) for url, source in plan.items()], consume)
+        finally:
+            self._deadline_at = None
+            self.close_connections()
+            if self._parse_pool:
+                self._parse_pool.shutdown(cancel_futures=True)
+                self._parse_pool = None
+            self.breaker.save()
+            if self.schedule:
+                self.schedule.save()
+        
+        http = self.http_stats()
+        if http["requests"]:
+            print(f"Made {http['requests']} requests over {http['connections']} new connections "
+                  f"({http['handshake_seconds']:.2f}s in handshakes), "
+                  f"{format_bytes(http['wire_bytes'])} on the wire for {format_bytes(http['body_bytes'])} of bodies")
+        parse_stats = self.parse_stats
+        if parse_stats["seconds"]:
+            print(f"Classified {parse_stats['lines']} lines in {parse_stats['seconds']:.2f}s "
+                  f"({parse_stats['lines'] / parse_stats['seconds']:,.0f} lines/s), "
+                  f"{parse_stats['rejected']} lines without indicators")
         return all_data
 
+    def write_feed(self, filename, title, label, indicators, count, sort_key=None):
+        """Write a feed snapshot with the next sequence number and its deltas
+
+        indicators must already be sorted by sort_key (plain string order when
+        None). The new snapshot is written beside the old one so the two can
+        be diffed by a linear merge before it replaces it.
+        """
+        path = self.data_dir / filename
+        previous_sequence = read_sequence(path)
+        sequence = previous_sequence + 1
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"# Argonis Intel {title} Feed\n")
+            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
+            f.write(f"# Total {label}: {count}\n")
+            f.write(f"# Sequence: {sequence}\n\n")
+            for indicator in indicators:
+                f.write(f"{indicator}\n")
+        
+        delta = None
+        if self.write_deltas and path.exists():
+            try:
+                delta = self.write_delta(path, tmp_path, previous_sequence, sequence, sort_key)
+            except Exception as e:
+                # A missing delta must not keep the new snapshot from replacing the old one
+                print(f"Skipping delta for {filename}: {e}")
+        os.replace(tmp_path, path)
+        return delta
+
+    def write_delta(self, old_path, new_path, previous_sequence, sequence, sort_key=None):
+        """Write <feed>.<sequence>.added.txt / .removed.txt under deltas/; returns (added, removed)"""
+        old, unparsed = read_snapshot(old_path, sort_key)
+        
+        delta_dir = self.data_dir / "deltas"
+        delta_dir.mkdir(exist_ok=True)
+        stem = old_path.name[:-len(".txt")]
+        counts = {"+": 0, "-": 0}
+        paths = {
+            "+": delta_dir / f"{stem}.{sequence}.added.txt",
+            "-": delta_dir / f"{stem}.{sequence}.removed.txt"
+        }
+        files = {change: open(path, 'w', encoding='utf-8') for change, path in paths.items()}
+        try:
+            for change, path in paths.items():
+                files[change].write(f"# {stem} {'added' if change == '+' else 'removed'} indicators\n")
+                files[change].write(f"# Sequence: {sequence}\n")
+                files[change].write(f"# Base sequence: {previous_sequence}\n\n")
+            for change, indicator in diff_sorted(old, read_feed(new_path), sort_key):
+                files[change].write(f"{indicator}\n")
+                counts[change] += 1
+            # Raw lines from an older snapshot are gone from the new one
+            for line in unparsed:
+                files["-"].write(f"{line}\n")
+            counts["-"] += len(unparsed)
+        except BaseException:
+            # Leave no half-written delta behind for consumers to apply
+            for f in files.values():
+                f.close()
+            for path in paths.values():
+                path.unlink(missing_ok=True)
+            raise
+        finally:
+            for f in files.values():
+                f.close()
+        
+        # Drop deltas that fell out of the retention window
+        for path in delta_dir.glob(f"{stem}.*.txt"):
+            parts = path.name[len(stem) + 1:].split(".")
+            if parts[0].isdigit() and int(parts[0]) <= sequence - self.delta_retention:
+                path.unlink()
+        return counts["+"], counts["-"]
+
+    def export_provenance(self, all_data, filename="argonisintel_Provenance.tsv"):
+        """Write every indicator with the IDs of the sources that listed it"""
+        path = self.data_dir / filename
+        tmp_path = path.with_name(path.name + ".tmp")
+        # Plain sorted text, so git stores each committed run as a small delta
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("# Argonis Intel Provenance Index\n")
+            f.write("# indicator<TAB>comma-separated source IDs\n")
+            for source_id, (name, url) in enumerate(self.sources):
+                f.write(f"# Source\t{source_id}\t{name}\t{url}\n")
+            f.write("\n")
+            for ip, bitmap in all_data["ips"].iter_sources():
+                f.write(f"{ip}\t{','.join(map(str, source_ids(bitmap)))}\n")
+            for feed_type in ("urls", "hashes"):
+                for indicator, bitmap in all_data[feed_type].items():
+                    f.write(f"{indicator}\t{','.join(map(str, source_ids(bitmap)))}\n")
+        os.replace(tmp_path, path)
+
+    def write_indexes(self, all_data):
+        """Write the sorted fixed-width binary index of each feed type and the domain trie"""
+        # IPs: merged [first, last] ranges, so CIDR coverage is one search
+        def ranges(family, size):
+            return (first.to_bytes(size, "big") + last.to_bytes(size, "big")
+                    for _, first, last in all_data["ips"].ranges((family,)))
+        write_index(self.data_dir / "argonisintel_IP_Feed.idx", [
+            (b"ipv4", 8, ranges(4, 4)),
+            (b"ipv6", 32, ranges(6, 16))
+        ])
+        
+        # Hashes: raw digests per algorithm; sorted hex sorts like the raw bytes, and
+        # the store iterates in sorted order, so each section is one pass over it
+        def digests(length):
+            return (bytes.fromhex(hash_value) for hash_value in all_data["hashes"] if len(hash_value) == length)
+        write_index(self.data_dir / "argonisintel_Hash_Feed.idx", [
+            (name, length // 2, digests(length)) for length, name in _HASH_SECTIONS.items()
+        ])
+        
+        # URLs and domains: sorted table of 8-byte hashed keys
+        keys = sorted_records((url_key(url) for url in all_data["urls"]), 8,
+                              self.spill_threshold, self.spill_dir)
+        write_index(self.data_dir / "argonisintel_URL_Feed.idx", [(b"urlkey", 8, keys)])
+        
+        # Bare domains (cert.pl, NRD, hostfiles) also cover their subdomains
+        write_domain_trie(self.data_dir / "argonisintel_URL_Feed.trie",
+                          (url for url in all_data["urls"] if "://" not in url),
+                          self.spill_threshold, self.spill_dir)
+
+    def export_filters(self, all_data):
+        """Write a Bloom filter per feed type, returning the total table size in bytes"""
+        store = all_data["ips"]
+        prefixes = sorted({(version, length) for version, _, length, _ in store.networks()})
+        size = write_filter(
+            self.data_dir / "argonisintel_IP_Feed.bloom", b"ip",
+            (ip_filter_key(version, network, length) for version, network, length, _ in store.networks()),
+            len(store), self.filter_fp_rate, prefixes
+        )
+        size += write_filter(
+            self.data_dir / "argonisintel_URL_Feed.bloom", b"url",
+            (url_filter_key(url) for url in all_data["urls"]),
+            len(all_data["urls"]), self.filter_fp_rate
+        )
+        size += write_filter(
+            self.data_dir / "argonisintel_Hash_Feed.bloom", b"hash",
+            (bytes.fromhex(hash_value) for hash_value in all_data["hashes"]),
+            len(all_data["hashes"]), self.filter_fp_rate
+        )
+        return size
+
+    def publish_shards(self):
+        """Split the written feeds into compressed shards and write the shard manifest
+
+        Lines are routed to per-shard temporary files in one pass over each
+        feed. A shard file is named after the SHA-256 of its content, so an
+        unchanged shard keeps its name and is not rewritten. Shards that
+        the new manifest no longer lists are deleted.
+        """
+        shard_dir = self.data_dir / "shards"
+        shard_dir.mkdir(exist_ok=True)
+        extension = SHARD_EXTENSIONS[self.shard_compression]
+        feeds = [
+            ("ips", "argonisintel_IP_Feed.txt", ip_shard),
+            ("cidrs", "argonisintel_IP_CIDR_Feed.txt", ip_shard),
+            ("urls", "argonisintel_URL_Feed.txt", lambda value: url_shard(value, self.shard_prefix)),
+            ("hashes", "argonisintel_Hash_Feed.txt", lambda value: hash_shard(value, self.shard_prefix))
+        ]
+        manifest = {
+            "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
+            "compression": self.shard_compression,
+            "feeds": {}
+        }
+        stats = {"shards": 0, "written": 0, "bytes": 0}
+        with tempfile.TemporaryDirectory(prefix="argonisintel-shards-", dir=self.spill_dir) as tmp:
+            for feed_type, filename, shard_of in feeds:
+                path = self.data_dir / filename
+                if feed_type == "cidrs" and not self.write_cidr_feed or not path.exists():
+                    continue
+                counts = {}
+                handles = {}
+                try:
+                    for indicator in read_feed(path):
+                        shard = shard_of(indicator)
+                        f = handles.get(shard)
+                        if f is None:
+                            if len(handles) >= 256:
+                                # Stay clear of the open file limit; shards reopen for appending
+                                for handle in handles.values():
+                                    handle.close()
+                                handles.clear()
+                            f = handles[shard] = open(Path(tmp) / shard, 'a', encoding='utf-8')
+                        f.write(f"{indicator}\n")
+                        counts[shard] = counts.get(shard, 0) + 1
+                finally:
+                    for handle in handles.values():
+                        handle.close()
+                
+                stem = filename[:-len(".txt")]
+                entries = []
+                for shard in sorted(counts):
+                    plain = Path(tmp) / shard
+                    digest = hashlib.sha256()
+                    with open(plain, 'rb') as f:
+                        for chunk in read_chunks(f):
+                            digest.update(chunk)
+                    digest = digest.hexdigest()
+                    target = shard_dir / f"{stem}.{shard}.{digest[:16]}.txt{extension}"
+                    if not target.exists():
+                        tmp_path = target.with_name(target.name + ".tmp")
+                        compress_shard(plain, tmp_path, self.shard_compression)
+                        os.replace(tmp_path, target)
+                        stats["written"] += 1
+                    plain.unlink()
+                    size = target.stat().st_size
+                    stats["bytes"] += size
+                    entries.append({
+                        "shard": shard,
+                        "file": f"shards/{target.name}",
+                        "sha256": digest,
+                        "count": counts[shard],
+                        "bytes": size
+                    })
+                stats["shards"] += len(entries)
+                manifest["feeds"][feed_type] = {
+                    "feed": filename,
+                    "sequence": read_sequence(path),
+                    "count": sum(counts.values()),
+                    "shards": entries
+                }
+        
+        manifest_path = self.data_dir / SHARD_MANIFEST
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+        
+        listed = {entry["file"] for feed in manifest["feeds"].values() for entry in feed["shards"]}
+        for path in shard_dir.glob("*"):
+            if f"shards/{path.name}" not in listed:
+                path.unlink()
+        return stats
+
+    def apply_lifecycle(self, all_data):
+        """Record this run in the lifecycle store and add back indicators still within their TTL"""
+        now = int(time.time())
+        store = LifecycleStore(self.lifecycle_path, self.ttls)
+        try:
+            store.record(all_data, now)
+            expired = store.expire(now)
+            retained = {"ips": 0, "urls": 0, "hashes": 0}
+            for feed_type, value, bitmap in store.retained(now):
+                if feed_type == "ips":
+                    for source in source_ids(bitmap) or [0]:
+                        all_data["ips"].add(value, source)
+                else:
+                    all_data[feed_type].add(value, bitmap)
+                retained[feed_type] += 1
+        finally:
+            store.close()
+        print(f"Kept {sum(retained.values())} indicators missing from this run within their TTL, "
+              f"expired {sum(expired.values())}")
+        return {"retained": retained, "expired": expired}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a stage of generate_feeds into phase_seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+
     def generate_feeds(self):
         """Generate the three required feed files"""
+        run_start = time.perf_counter()
+        self.phase_seconds = {}
         print("Collecting data from all sources...")
-        all_data = self.collect_feeds()
+        with self.phase("collect"):
+            all_data = self.collect_feeds()
+        deltas = {}
+        
+        if self.lifecycle_path:
+            print("Updating indicator lifecycle store...")
+            with self.phase("lifecycle"):
+                lifecycle = self.apply_lifecycle(all_data)
         
-        # Write IP feed
+        # Write IP feed (IPStore iterates in numeric order once compacted)
         print("Writing IP feed...")
-        with open("argonisintel_IP_Feed.txt", 'w', encoding='utf-8') as f:
-            f.write("# Argonis Intel IP Feed\n")
-            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-            f.write(f"# Total IPs: {len(all_data['ips'])}\n\n")
-            for ip in sorted(all_data["ips"]):
-                f.write(f"{ip}\n")
+        with self.phase("sort_ips"):
+            all_data["ips"].compact()
+        with self.phase("write_ips"):
+            deltas["ips"] = self.write_feed("argonisintel_IP_Feed.txt", "IP", "IPs",
+                                            all_data["ips"], len(all_data["ips"]), ip_sort_key)
+        
+        # Write collapsed CIDR feed
+        if self.write_cidr_feed:
+            print("Writing collapsed CIDR feed...")
+            with self.phase("sort_cidrs"):
+                if self.spill_threshold:
+                    # Counted in a first pass and generated again while writing
+                    cidr_count = sum(1 for _ in all_data["ips"].collapsed())
+                    cidrs = all_data["ips"].collapsed()
+                else:
+                    cidrs = list(all_data["ips"].collapsed())
+                    cidr_count = len(cidrs)
+            with self.phase("write_cidrs"):
+                deltas["cidrs"] = self.write_feed("argonisintel_IP_CIDR_Feed.txt", "IP CIDR", "CIDRs",
+                                                  cidrs, cidr_count, ip_sort_key)
         
         # Write URL feed
         print("Writing URL feed...")
-        with open("argonisintel_URL_Feed.txt", 'w', encoding='utf-8') as f:
-            f.write("# Argonis Intel URL Feed\n")
-            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-            f.write(f"# Total URLs: {len(all_data['urls'])}\n\n")
-            for url in sorted(all_data["urls"]):
-                f.write(f"{url}\n")
+        with self.phase("sort_urls"):
+            all_data["urls"].compact()
+        with self.phase("write_urls"):
+            deltas["urls"] = self.write_feed("argonisintel_URL_Feed.txt", "URL", "URLs",
+                                             all_data["urls"], len(all_data["urls"]))
         
         # Write Hash feed
         print("Writing Hash feed...")
-        with open("argonisintel_Hash_Feed.txt", 'w', encoding='utf-8') as f:
-            f.write("# Argonis Intel Hash Feed\n")
-            f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-            f.write(f"# Total Hashes: {len(all_data['hashes'])}\n\n")
-            for hash_value in sorted(all_data["hashes"]):
-                f.write(f"{hash_value}\n")
+        with self.phase("sort_hashes"):
+            all_data["hashes"].compact()
+        with self.phase("write_hashes"):
+            deltas["hashes"] = self.write_feed("argonisintel_Hash_Feed.txt", "Hash", "Hashes",
+                                               all_data["hashes"], len(all_data["hashes"]))
         
-        return {
+        if self.write_index:
+            print("Writing binary lookup indexes...")
+            with self.phase("write_indexes"):
+                self.write_indexes(all_data)
+        
+        if self.write_filters:
+            print("Writing Bloom filters...")
+            with self.phase("write_filters"):
+                filter_bytes = self.export_filters(all_data)
+        
+        if self.write_provenance:
+            print("Writing provenance index...")
+            with self.phase("write_provenance"):
+                self.export_provenance(all_data)
+        
+        if self.write_shards:
+            print("Writing feed shards...")
+            with self.phase("write_shards"):
+                shard_stats = self.publish_shards()
+        
+        stats = {
             "ips": len(all_data["ips"]),
             "urls": len(all_data["urls"]),
-            "hashes": len(all_data["hashes"])
+            "hashes": len(all_data["hashes"]),
+            "deltas": {feed: delta for feed, delta in deltas.items() if delta is not None}
         }
+        if self.write_cidr_feed:
+            stats["cidrs"] = cidr_count
+        if self.write_filters:
+            stats["filter_bytes"] = filter_bytes
+        if self.lifecycle_path:
+            stats["lifecycle"] = lifecycle
+        if self.write_shards:
+            stats["shards"] = shard_stats
+        stats["seconds"] = time.perf_counter() - run_start
+        
+        if self.metrics_dir:
+            self.write_run_report(stats)
+        return stats
+
+    def http_stats(self):
+        """Requests, new connections, handshake time and transfer sizes summed over all sources"""
+        totals = {"requests": 0, "connections": 0, "handshake_seconds": 0.0, "wire_bytes": 0, "body_bytes": 0}
+        for metrics in self.source_metrics.values():
+            for key in ("requests", "connections", "handshake_seconds", "wire_bytes"):
+                totals[key] += metrics.get(key, 0)
+            # Bodies served from the cache never crossed the wire
+            if metrics.get("requests") and not metrics.get("cached"):
+                totals["body_bytes"] += metrics.get("bytes", 0)
+        totals["handshake_seconds"] = round(totals["handshake_seconds"], 4)
+        return totals
+
+    def source_report(self):
+        """Per-source metrics of the last run in source-table order"""
+        report = []
+        for name, url in self.sources:
+            metrics = self.source_metrics.get(url, {})
+            if metrics.get("error"):
+                status = "error"
+            elif metrics.get("skipped"):
+                status = "skipped"
+            elif metrics.get("deferred"):
+                # Not due yet: served from the snapshot without a request
+                status = "deferred"
+            elif not metrics.get("indicators"):
+                # Answered but yielded nothing: the source may have gone dead
+                status = "empty"
+            elif metrics.get("cached"):
+                status = "cached"
+            else:
+                status = "ok"
+            stream = metrics.get("stream_seconds", 0.0)
+            parse = metrics.get("parse_seconds", 0.0)
+            report.append({
+                "name": name,
+                "url": url,
+                "status": status,
+                "error": metrics.get("error"),
+                "http_status": metrics.get("http_status"),
+                "cached": metrics.get("cached", False),
+                "skipped": metrics.get("skipped"),
+                "stale": metrics.get("stale", False),
+                "attempts": metrics.get("attempts", 1),
+                "ttfb_seconds": metrics.get("ttfb_seconds"),
+                # 0 connections: every request reused a kept-alive one
+                "requests": metrics.get("requests", 0),
+                "connections": metrics.get("connections", 0),
+                "handshake_seconds": round(metrics.get("handshake_seconds", 0.0), 4),
+                "wire_bytes": metrics.get("wire_bytes", 0),
+                # The body is parsed while it streams in; parsing is reported separately
+                "download_seconds": round(max(stream - parse, 0.0), 4),
+                "parse_seconds": round(parse, 4),
+                "bytes": metrics.get("bytes", 0),
+                "lines": metrics.get("lines", 0),
+                "indicators": metrics.get("indicators", 0),
+                "rejected": metrics.get("rejected", 0)
+            })
+        return report
+
+    def write_run_report(self, stats):
+        """Write argonisintel_Run_Report.json and the argonisintel.prom Prometheus textfile"""
+        # Relative to data_dir, like the feeds themselves
+        directory = self.data_dir / self.metrics_dir
+        directory.mkdir(parents=True, exist_ok=True)
+        sources = self.source_report()
+        report = {
+            "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
+            "duration_seconds": round(stats["seconds"], 3),
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phase_seconds.items()},
+            "feeds": {feed: stats[feed] for feed in ("ips", "urls", "hashes", "cidrs") if feed in stats},
+            "parse": dict(self.parse_stats, seconds=round(self.parse_stats["seconds"], 4)),
+            "cache": self.cache_stats,
+            "http": self.http_stats(),
+            "sources": sources
+        }
+        if "lifecycle" in stats:
+            report["lifecycle"] = stats["lifecycle"]
+        if "shards" in stats:
+            report["shards"] = stats["shards"]
+        report_path = directory / "argonisintel_Run_Report.json"
+        with open(report_path.with_name(report_path.name + ".tmp"), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        os.replace(report_path.with_name(report_path.name + ".tmp"), report_path)
+
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines = [
+            "# HELP argonisintel_run_duration_seconds Wall-clock time of the last collection run.",
+            "# TYPE argonisintel_run_duration_seconds gauge",
+            f"argonisintel_run_duration_seconds {stats['seconds']:.3f}",
+            "# HELP argonisintel_run_timestamp_seconds Unix time the last run finished.",
+            "# TYPE argonisintel_run_timestamp_seconds gauge",
+            f"argonisintel_run_timestamp_seconds {int(time.time())}",
+            "# HELP argonisintel_phase_seconds Time spent in each generate_feeds phase.",
+            "# TYPE argonisintel_phase_seconds gauge"
+        ]
+        lines += [f'argonisintel_phase_seconds{{phase="{phase}"}} {seconds:.4f}'
+                  for phase, seconds in self.phase_seconds.items()]
+        lines += [
+            "# HELP argonisintel_feed_indicators Indicators written to each feed.",
+            "# TYPE argonisintel_feed_indicators gauge"
+        ]
+        lines += [f'argonisintel_feed_indicators{{feed="{feed}"}} {count}'
+                  for feed, count in report["feeds"].items()]
+        series = (
+            ("up", "1 if the source answered and yielded indicators or was not due yet, else 0", None),
+            ("ttfb_seconds", "Time until the response headers arrived.", "ttfb_seconds"),
+            ("connections", "New connections opened (0 when kept-alive ones were reused).", "connections"),
+            ("handshake_seconds", "Time spent on TCP and TLS handshakes.", "handshake_seconds"),
+            ("wire_bytes", "Body bytes transferred, before gzip/deflate decoding.", "wire_bytes"),
+            ("download_seconds", "Time spent receiving the body.", "download_seconds"),
+            ("parse_seconds", "Time spent classifying the body.", "parse_seconds"),
+            ("bytes", "Body bytes processed (cached bodies included).", "bytes"),
+            ("lines", "Lines received.", "lines"),
+            ("indicators", "Indicators parsed.", "indicators"),
+            ("rejected_lines", "Lines without any indicator.", "rejected")
+        )
+        for metric, help_text, key in series:
+            lines += [
+                f"# HELP argonisintel_source_{metric} {help_text}",
+                f"# TYPE argonisintel_source_{metric} gauge"
+            ]
+            for source in sources:
+                labels = f'source="{label(source["name"])}",url="{label(source["url"])}"'
+                if key is None:
+                    labels += f',status="{source["status"]}",error="{label(source["error"] or "")}"'
+                    # Deferred sources are served from their last snapshot on purpose
+                    value = int(source["status"] in ("ok", "cached", "deferred"))
+                else:
+                    value = source[key]
+                    if value is None:
+                        continue
+                lines.append(f"argonisintel_source_{metric}{{{labels}}} {value}")
+
+        # Written atomically so the node exporter never reads a partial file
+        prom_path = directory / "argonisintel.prom"
+        with open(prom_path.with_name(prom_path.name + ".tmp"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(prom_path.with_name(prom_path.name + ".tmp"), prom_path)
 
 if __name__ == "__main__":
-    collector = ThreatIntelCollector()
+    parser = argparse.ArgumentParser(description="Argonis threat intelligence feed collector")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="maximum number of feeds fetched at the same time (1 = serial)")
+    parser.add_argument("--per-host", type=int, default=4,
+                        help="maximum concurrent requests to any single host")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="keep-alive connections kept open per host (default: --per-host)")
+    parser.add_argument("--cache-dir", default=".argonisintel_cache",
+                        help="directory holding cached responses for conditional GETs")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always download every feed in full")
+    parser.add_argument("--cidr-feed", action="store_true",
+                        help="also write argonisintel_IP_CIDR_Feed.txt with ranges merged and covered hosts dropped")
+    parser.add_argument("--no-deltas", action="store_true",
+                        help="do not write added/removed delta files under deltas/")
+    parser.add_argument("--delta-retention", type=int, default=168,
+                        help="number of runs whose delta files are kept")
+    parser.add_argument("--no-provenance", action="store_true",
+                        help="do not write the argonisintel_Provenance.tsv source index")
+    parser.add_argument("--no-index", action="store_true",
+                        help="do not write the argonisintel_*_Feed.idx binary lookup indexes")
+    parser.add_argument("--no-filters", action="store_true",
+                        help="do not write the argonisintel_*_Feed.bloom Bloom filters")
+    parser.add_argument("--filter-fp-rate", type=float, default=0.001,
+                        help="target false-positive rate of the Bloom filters")
+    parser.add_argument("--metrics-dir", default=".",
+                        help="where argonisintel_Run_Report.json and argonisintel.prom are written")
+    parser.add_argument("--no-metrics", action="store_true",
+                        help="do not write the run report or the Prometheus textfile")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="extra attempts for a source that fails before its body starts")
+    parser.add_argument("--connect-timeout", type=float, default=10,
+                        help="seconds to wait for a connection")
+    parser.add_argument("--read-timeout", type=float, default=30,
+                        help="seconds to wait between bytes of a response")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="total seconds for fetching; later sources fall back to their last good copy")
+    parser.add_argument("--breaker-threshold", type=int, default=3,
+                        help="failed runs in a row before a source is skipped")
+    parser.add_argument("--breaker-cooldown", type=float, default=6,
+                        help="hours a tripped source is skipped before it is tried again")
+    parser.add_argument("--parse-processes", type=int, default=1,
+                        help="processes classifying large feed bodies in parallel (0: one per core, default 1)")
+    parser.add_argument("--spill-threshold", type=int,
+                        help="keep at most N indicators per feed type in memory, spilling sorted runs "
+                             "to temporary files and merging them when the feeds are written")
+    parser.add_argument("--spill-dir", help="directory for the spilled runs (default: system temp dir)")
+    parser.add_argument("--no-lifecycle", action="store_true",
+                        help="build the feeds from this run only, without the first/last-seen store")
+    parser.add_argument("--ip-ttl", type=float, default=24,
+                        help="hours an IP stays in the feed after it was last seen")
+    parser.add_argument("--url-ttl", type=float, default=72,
+                        help="hours a URL or domain stays in the feed after it was last seen")
+    parser.add_argument("--hash-ttl", type=float, default=720,
+                        help="hours a hash stays in the feed after it was last seen")
+    parser.add_argument("--shards", action="store_true",
+                        help="also publish each feed as compressed shards under shards/ with a manifest")
+    parser.add_argument("--shard-compression", choices=sorted(SHARD_EXTENSIONS), default="gzip",
+                        help="compression of the shard files (zstd needs the zstandard package)")
+    parser.add_argument("--shard-prefix", type=int, default=2,
+                        help="hex digits of the hash / URL key that pick a URL or hash shard")
+    parser.add_argument("--refresh-all", action="store_true",
+                        help="fetch every source instead of only those due under the learned schedule")
+    parser.add_argument("--max-refresh-interval", type=float, default=24,
+                        help="longest time in hours a source is served from its snapshot")
+    subparsers = parser.add_subparsers(dest="command")
+    provenance = subparsers.add_parser("provenance", help="show which sources listed the given indicators")
+    provenance.add_argument("indicators", nargs="+")
+    provenance.add_argument("--index", default="argonisintel_Provenance.tsv",
+                            help="provenance sidecar written by a collection run")
+    lifecycle = subparsers.add_parser("lifecycle", help="show when indicators were first and last seen")
+    lifecycle.add_argument("indicators", nargs="+")
+    lifecycle.add_argument("--db", default=".argonisintel_cache/lifecycle.db",
+                           help="lifecycle store kept in the cache directory")
+    lookup = subparsers.add_parser("lookup", help="check indicators against the binary feed indexes")
+    lookup.add_argument("indicators", nargs="+")
+    lookup.add_argument("--dir", default=".", help="directory holding argonisintel_*_Feed.idx")
+    match = subparsers.add_parser("match", help="scan CSV, JSONL or plain-text logs for listed indicators")
+    match.add_argument("logs", nargs="+")
+    match.add_argument("--dir", default=".", help="directory holding argonisintel_*_Feed.idx")
+    match.add_argument("--processes", type=int, default=None, help="worker processes (default: CPU count)")
+    match.add_argument("--output", default="-", help="TSV of hits: log, offset, line, feed, indicator")
+    sync = subparsers.add_parser("sync", help="fetch the feed shards that changed since the last sync")
+    sync.add_argument("source", help="directory or base URL holding " + SHARD_MANIFEST)
+    sync.add_argument("--dir", default=".", help="local mirror directory")
+    sync.add_argument("--only", nargs="+", help="shard name patterns to keep, e.g. 'sha256-*' 'ipv4-010'")
+    sync.add_argument("--parallel", type=int, default=8, help="shards fetched at the same time")
+    args = parser.parse_args()
+
+    if args.shard_compression == "zstd" and zstandard is None:
+        parser.error("--shard-compression zstd needs the zstandard package")
+
+    if args.command == "sync":
+        fetched, kept, removed, size = sync_shards(args.source, args.dir, args.only, args.parallel)
+        print(f"Fetched {fetched} shards ({format_bytes(size)}), {kept} unchanged, {removed} removed")
+        sys.exit(0)
+
+    if args.command == "match":
+        output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+        total = 0
+        for log in args.logs:
+            for offset, line_number, feed_type, value in match_log(log, args.dir, args.processes):
+                output.write(f"{log}\t{offset}\t{line_number}\t{feed_type}\t{value}\n")
+                total += 1
+        if output is not sys.stdout:
+            output.close()
+        print(f"{total} hits", file=sys.stderr)
+        sys.exit(0)
+
+    if args.command == "lookup":
+        feeds = []
+        for feed in ("IP", "URL", "Hash"):
+            bloom = Path(args.dir) / f"argonisintel_{feed}_Feed.bloom"
+            feeds.append((FeedFilter(bloom) if bloom.exists() else None,
+                          FeedIndex(Path(args.dir) / f"argonisintel_{feed}_Feed.idx")))
+        trie = Path(args.dir) / "argonisintel_URL_Feed.trie"
+        trie = DomainTrie(trie) if trie.exists() else None
+        for indicator in args.indicators:
+            # The filter rules out most misses before the exact index search
+            listed = any((bloom is None or indicator in bloom) and indicator in index
+                         for bloom, index in feeds)
+            if listed:
+                print(f"{indicator}: listed")
+                continue
+            parent = trie.match(_url_host(indicator) if "://" in indicator else indicator) if trie else None
+            print(f"{indicator}: {f'covered by {parent}' if parent else 'not listed'}")
+        sys.exit(0)
+
+    if args.command == "lifecycle":
+        store = LifecycleStore(args.db)
+        for indicator in args.indicators:
+            value = ProvenanceIndex.normalize(indicator)
+            rows = [(feed_type, store.lookup(feed_type, value)) for feed_type in store.KINDS]
+            rows = [(feed_type, row) for feed_type, row in rows if row]
+            if not rows:
+                print(f"{indicator}: not in the lifecycle store")
+            for feed_type, (first_seen, last_seen, hits) in rows:
+                print(f"{indicator}: {feed_type}, first seen {datetime.fromtimestamp(first_seen):%Y-%m-%d %H:%M}, "
+                      f"last seen {datetime.fromtimestamp(last_seen):%Y-%m-%d %H:%M}, in {hits} runs")
+        store.close()
+        sys.exit(0)
+
+    if args.command == "provenance":
+        index = ProvenanceIndex(args.index)
+        for indicator in args.indicators:
+            listed = index.sources_for(indicator)
+            print(f"{indicator}: listed by {len(listed)} of {len(index.sources)} sources")
+            for name, url in listed:
+                print(f"  {name}  {url}")
+        sys.exit(0)
+
+    collector = ThreatIntelCollector(
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        pool_size=args.pool_size,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        write_cidr_feed=args.cidr_feed,
+        write_deltas=not args.no_deltas,
+        delta_retention=args.delta_retention,
+        write_provenance=not args.no_provenance,
+        write_index=not args.no_index,
+        write_filters=not args.no_filters,
+        filter_fp_rate=args.filter_fp_rate,
+        metrics_dir=None if args.no_metrics else args.metrics_dir,
+        retries=args.retries,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        deadline=args.deadline,
+        breaker_threshold=args.breaker_threshold,
+        breaker_cooldown=args.breaker_cooldown * 3600,
+        adaptive_refresh=not args.refresh_all,
+        max_refresh_interval=args.max_refresh_interval * 3600,
+        lifecycle=not args.no_lifecycle,
+        spill_threshold=args.spill_threshold,
+        parse_processes=args.parse_processes,
+        spill_dir=args.spill_dir,
+        write_shards=args.shards,
+        shard_compression=args.shard_compression,
+        shard_prefix=args.shard_prefix,
+        ttls={"ips": args.ip_ttl * 3600, "urls": args.url_ttl * 3600, "hashes": args.hash_ttl * 3600}
+    )
     
     print("Starting threat intelligence collection...")
     stats = collector.generate_feeds()
@@ -263,3 +3332,26 @@ if __name__ == "__main__":
     print(f"Generated argonisintel_IP_Feed.txt with {stats['ips']} IPs")
     print(f"Generated argonisintel_URL_Feed.txt with {stats['urls']} URLs")
     print(f"Generated argonisintel_Hash_Feed.txt with {stats['hashes']} hashes")
+    if "cidrs" in stats:
+        print(f"Generated argonisintel_IP_CIDR_Feed.txt with {stats['cidrs']} CIDRs")
+    if "filter_bytes" in stats:
+        print(f"Generated Bloom filters ({format_bytes(stats['filter_bytes'])} at "
+              f"{args.filter_fp_rate:.2%} false positives)")
+    if "shards" in stats:
+        shard_stats = stats["shards"]
+        print(f"Published {shard_stats['shards']} shards ({format_bytes(shard_stats['bytes'])}), "
+              f"{shard_stats['written']} new or changed")
+    for feed, (added, removed) in stats["deltas"].items():
+        print(f"Delta {feed}: +{added} -{removed}")
+    statuses = {}
+    for source in collector.source_report():
+        statuses.setdefault(source["status"], []).append(source["name"])
+    print("Sources: " + ", ".join(f"{len(names)} {status}" for status, names in sorted(statuses.items())))
+    for status in ("error", "empty"):
+        if status in statuses:
+            print(f"  {status}: {', '.join(statuses[status])}")
+    if collector.cache:
+        cache_stats = collector.cache_stats
+        print(f"Served {cache_stats['cached']} feeds from cache and {cache_stats['deferred']} from "
+              f"snapshots not yet due ({format_bytes(cache_stats['bytes_saved'])} not re-downloaded), "
+              f"downloaded {cache_stats['fetched']}")
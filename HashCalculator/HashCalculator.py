@@ -2,9 +2,14 @@ import sys
 import subprocess
 import os
 import threading
+import queue
+import itertools
 import hashlib
+import argparse
+import csv
+import time
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 
 # ----------------- AUTO INSTALL -----------------
 
@@ -19,18 +24,330 @@ from tkinterdnd2 import TkinterDnD, DND_FILES
 
 # ----------------- HASHING -----------------
 
-def calculate_hashes(filepath):
-    hashes = {
-        "MD5": hashlib.md5(),
-        "SHA1": hashlib.sha1(),
-        "SHA256": hashlib.sha256()
-    }
-    with open(filepath, "rb") as f:
-        while chunk := f.read(8192):
+ALGORITHMS = ("MD5", "SHA1", "SHA256")
+
+# Two buffers of this size per file: one is read into while the other is hashed
+BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class HashCancelled(Exception):
+    """The file's job was cancelled while it was being hashed"""
+
+
+def _hash_worker(digest, current, barrier):
+    """Update one digest with each chunk the reader publishes until it publishes None"""
+    try:
+        while True:
+            barrier.wait()
+            chunk = current[0]
+            if chunk is None:
+                return
+            digest.update(chunk)
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        return
+
+
+def _fill(f, buffer):
+    """Read into buffer until it is full or the file ends; returns the bytes read
+
+    Unbuffered reads may come back short before the end of the file (network
+    shares, FUSE), so only a read of 0 bytes means the file has ended.
+    """
+    view = memoryview(buffer)
+    size = 0
+    while size < len(buffer):
+        read = f.readinto(view[size:])
+        if not read:
+            break
+        size += read
+    return size
+
+
+def calculate_hashes(filepath, buffer_size=BUFFER_SIZE, cancel=None):
+    hashes = {algo: hashlib.new(algo.lower()) for algo in ALGORITHMS}
+
+    with open(filepath, "rb", buffering=0) as f:
+        # Small files get small buffers; one byte spare so reaching the end shows in the first read
+        buffer_size = min(buffer_size, os.fstat(f.fileno()).st_size + 1)
+        buffers = [bytearray(buffer_size)]
+        size = _fill(f, buffers[0])
+        if size < buffer_size:
+            # Fits in one buffer: not worth starting threads
+            view = memoryview(buffers[0])[:size]
             for h in hashes.values():
-                h.update(chunk)
+                h.update(view)
+            return {k: v.hexdigest() for k, v in hashes.items()}
+
+        # One thread per digest; hashlib and readinto release the GIL on large buffers,
+        # so the digests and the next read all run at once
+        buffers.append(bytearray(buffer_size))
+        current = [None]
+        barrier = threading.Barrier(len(hashes) + 1)
+        workers = [
+            threading.Thread(target=_hash_worker, args=(h, current, barrier), daemon=True)
+            for h in hashes.values()
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            index = 0
+            while size:
+                if cancel is not None and cancel():
+                    raise HashCancelled(filepath)
+                current[0] = memoryview(buffers[index])[:size]
+                barrier.wait()
+                index ^= 1
+                size = _fill(f, buffers[index])
+                barrier.wait()
+            current[0] = None
+            barrier.wait()
+        finally:
+            # Releases the workers if the read failed part way
+            barrier.abort()
+        for worker in workers:
+            worker.join()
+
     return {k: v.hexdigest() for k, v in hashes.items()}
 
+# ----------------- SCHEDULER -----------------
+
+# Files hashed at once per device: parallel reads help flash storage, but make
+# a spinning disk seek between files
+SSD_WORKERS = 4
+HDD_WORKERS = 1
+
+
+def _windows_seek_penalty(path):
+    import ctypes
+    from ctypes import wintypes
+
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if not drive or drive.startswith("\\\\"):
+        # Network share
+        return None
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    # No access rights needed to query the device; share read/write, OPEN_EXISTING
+    handle = kernel32.CreateFileW(f"\\\\.\\{drive}", 0, 3, None, 3, 0, None)
+    if handle is None or handle == wintypes.HANDLE(-1).value:
+        return None
+    try:
+        # STORAGE_PROPERTY_QUERY for StorageDeviceSeekPenaltyProperty (7), PropertyStandardQuery
+        query = (wintypes.DWORD * 3)(7, 0, 0)
+        # DEVICE_SEEK_PENALTY_DESCRIPTOR: Version, Size, IncursSeekPenalty
+        descriptor = (wintypes.DWORD * 3)()
+        returned = wintypes.DWORD()
+        ok = kernel32.DeviceIoControl(
+            wintypes.HANDLE(handle), 0x2D1400,  # IOCTL_STORAGE_QUERY_PROPERTY
+            query, ctypes.sizeof(query), descriptor, ctypes.sizeof(descriptor),
+            ctypes.byref(returned), None
+        )
+        return bool(descriptor[2] & 0xFF) if ok else None
+    finally:
+        kernel32.CloseHandle(wintypes.HANDLE(handle))
+
+
+def is_rotational(path):
+    """True for a file on spinning media, False on solid state, None when it can't be told"""
+    try:
+        if sys.platform == "win32":
+            return _windows_seek_penalty(path)
+        st = os.stat(path)
+        device = f"/sys/dev/block/{os.major(st.st_dev)}:{os.minor(st.st_dev)}"
+        # Partitions keep the flag on their parent disk
+        for block in (device, os.path.join(device, "..")):
+            flag = os.path.join(block, "queue", "rotational")
+            if os.path.exists(flag):
+                with open(flag) as f:
+                    return f.read().strip() == "1"
+    except (OSError, AttributeError, ValueError):
+        pass
+    return None
+
+
+# Files a directory walk may have waiting in the queues before it pauses
+MAX_PENDING = 1000
+
+# Results waiting for the UI before workers pause
+MAX_EVENTS = 5000
+
+
+def iter_files(root):
+    """Yield the files under root as they are found, without listing the tree first
+
+    Directory symlinks are not followed, so links can't send the walk in
+    circles; unreadable directories are skipped.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+
+
+class HashJob:
+    def __init__(self, job_id, path, walk=None):
+        self.id = job_id
+        self.path = path
+        # The TreeWalk that found the file, for files inside a dropped directory
+        self.walk = walk
+        self.state = "queued"
+        self.cancelled = False
+
+
+class TreeWalk:
+    def __init__(self, walk_id, root):
+        self.id = walk_id
+        self.path = root
+        self.found = 0
+        self.cancelled = False
+        # One slot per file waiting or hashing, so the walk stays just ahead of the workers
+        self.slots = threading.Semaphore(MAX_PENDING)
+
+
+class HashScheduler:
+    """Bounded hashing workers per storage device
+
+    Each device gets its own queue and HDD_WORKERS or SSD_WORKERS threads
+    (devices of unknown type count as solid state). Workers never touch
+    the UI: they post (state, job, value) events to self.events, which
+    the UI thread drains. A directory walk posts ("walked", walk, files
+    found) once it has queued its last file. self.events holds at most
+    MAX_EVENTS, so workers wait for a UI that falls behind.
+    """
+
+    def __init__(self, ssd_workers=SSD_WORKERS, hdd_workers=HDD_WORKERS):
+        self.ssd_workers = ssd_workers
+        self.hdd_workers = hdd_workers
+        self.events = queue.Queue(MAX_EVENTS)
+        self.counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+        self._jobs = {}
+        self._walks = {}
+        self._lanes = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, path, walk=None):
+        """Queue a file for hashing and return its job id"""
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = None
+        lane = self._lanes.get(device)
+        if lane is None:
+            workers = self.hdd_workers if is_rotational(path) else self.ssd_workers
+            with self._lock:
+                lane = self._lanes.get(device)
+                if lane is None:
+                    lane = self._lanes[device] = queue.Queue()
+                    for _ in range(workers):
+                        threading.Thread(target=self._work, args=(lane,), daemon=True).start()
+
+        with self._lock:
+            job = HashJob(next(self._ids), path, walk)
+            self._jobs[job.id] = job
+            self.counts["queued"] += 1
+        lane.put(job)
+        return job.id
+
+    def submit_tree(self, root):
+        """Hash every file under root, starting as soon as the walk finds them; returns the walk's id"""
+        with self._lock:
+            walk = TreeWalk(next(self._ids), root)
+            self._walks[walk.id] = walk
+        threading.Thread(target=self._walk, args=(walk,), daemon=True).start()
+        return walk.id
+
+    def cancel(self, job_id):
+        """Cancel a job or walk; returns the queued jobs this finished as cancelled
+
+        Those get no event (the caller drains the events and must not block
+        on them), running ones stop at their next buffer and post one.
+        """
+        cancelled = []
+        with self._lock:
+            walk = self._walks.get(job_id)
+            if walk is not None:
+                walk.cancelled = True
+            # A walk's files may still be hashing after the walk itself has ended
+            jobs = [
+                job for job in self._jobs.values()
+                if job.id == job_id or (job.walk is not None and job.walk.id == job_id)
+            ]
+            for job in jobs:
+                job.cancelled = True
+                if job.state == "queued":
+                    self._finish(job, "cancelled")
+                    cancelled.append(job)
+        return cancelled
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def _finish(self, job, state):
+        # Called with the lock held; the event is posted after it is released
+        self.counts[job.state] -= 1
+        self.counts[state] += 1
+        job.state = state
+        del self._jobs[job.id]
+        if job.walk:
+            job.walk.slots.release()
+
+    def _walk(self, walk):
+        for path in iter_files(walk.path):
+            walk.slots.acquire()
+            if walk.cancelled:
+                break
+            walk.found += 1
+            self.submit(path, walk)
+        with self._lock:
+            del self._walks[walk.id]
+        self.events.put(("walked", walk, walk.found))
+
+    def _work(self, lane):
+        while True:
+            job = lane.get()
+            with self._lock:
+                if job.state != "queued":
+                    # Cancelled while it waited
+                    continue
+                cancelled = job.walk is not None and job.walk.cancelled
+                if cancelled:
+                    # Queued by its walk just as the walk was cancelled
+                    self._finish(job, "cancelled")
+                else:
+                    self.counts["queued"] -= 1
+                    self.counts["running"] += 1
+                    job.state = "running"
+            if cancelled:
+                self.events.put(("cancelled", job, None))
+                continue
+            self.events.put(("running", job, None))
+
+            try:
+                state, value = "done", calculate_hashes(job.path, cancel=lambda: job.cancelled)
+            except HashCancelled:
+                state, value = "cancelled", None
+            except OSError as e:
+                state, value = "failed", e.strerror or str(e)
+            with self._lock:
+                self._finish(job, state)
+            self.events.put((state, job, value))
+
 # ----------------- TOAST -----------------
 
 class Toast(tk.Toplevel):
@@ -59,6 +376,30 @@ class Toast(tk.Toplevel):
 
 # ----------------- APP -----------------
 
+# How often the UI drains worker events (ms), and how long one pass may take (s)
+POLL_INTERVAL = 100
+POLL_BUDGET = 0.03
+
+# File rows inserted per pass when a directory of a dropped folder is expanded
+FILL_BATCH = 500
+
+STATUS_TEXT = {"queued": "Queued", "running": "Hashing...", "failed": "Error", "cancelled": "Cancelled"}
+
+
+def rollup_text(counts):
+    """Summary of a directory's results, such as 120 files hashed, 2 failed"""
+    text = f"{counts['done']} files hashed"
+    for state in ("failed", "cancelled"):
+        if counts.get(state):
+            text += f", {counts[state]} {state}"
+    return text
+
+
+def result_row(path, digests=None, error=""):
+    """CSV row of one file: path, a digest per algorithm, error"""
+    return [path, *(digests or ("" for _ in ALGORITHMS)), error]
+
+
 class HashApp(TkinterDnD.Tk):
     def __init__(self):
         super().__init__()
@@ -66,8 +407,19 @@ class HashApp(TkinterDnD.Tk):
         self.geometry("950x550")
         self.configure(bg="#1e1e1e")
 
+        self.scheduler = HashScheduler()
+        # Treeview row of each job, and the job of each row
+        self.rows = {}
+        self.jobs = {}
+        # Dropped directories by walk id and by row; each keeps a rollup per subdirectory
+        # holding its results, whose rows exist only while it is expanded
+        self.walks = {}
+        self.walk_rows = {}
+        self.dir_rows = {}
+
         self._setup_style()
         self._build_ui()
+        self.after(POLL_INTERVAL, self._poll)
 
     def _setup_style(self):
         style = ttk.Style(self)
@@ -115,7 +467,17 @@ class HashApp(TkinterDnD.Tk):
         self.tree.column("Hash", width=460)
         self.tree.column("Copy", width=90, anchor="center")
 
-        self.tree.pack(expand=True, fill="both", padx=10, pady=10)
+        self.tree.pack(expand=True, fill="both", padx=10, pady=(10, 0))
+
+        self.status = tk.Label(
+            self,
+            text="",
+            bg="#1e1e1e",
+            fg="#9cdcfe",
+            font=("Segoe UI", 9),
+            anchor="w"
+        )
+        self.status.pack(fill="x", padx=10, pady=(4, 8))
 
         # Fake rounded button look
         self.tree.tag_configure(
@@ -123,11 +485,18 @@ class HashApp(TkinterDnD.Tk):
             foreground="#4FC1FF",
             background="#2b2b2b"
         )
+        self.tree.tag_configure(
+            "cancel_btn",
+            foreground="#F48771",
+            background="#2b2b2b"
+        )
 
         self.tree.drop_target_register(DND_FILES)
         self.tree.dnd_bind("<<Drop>>", self._on_drop)
 
         self.tree.bind("<Button-1>", self._handle_click)
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_close)
         self.tree.bind("<Button-3>", self._right_click_menu)
 
         self.menu = tk.Menu(self, tearoff=0, bg="#2d2d2d", fg="white")
@@ -135,27 +504,198 @@ class HashApp(TkinterDnD.Tk):
     # ----------------- EVENTS -----------------
 
     def _on_drop(self, event):
-        for file in self.tk.splitlist(event.data):
-            if os.path.isfile(file):
-                threading.Thread(
-                    target=self._process_file,
-                    args=(file,),
-                    daemon=True
-                ).start()
-
-    def _process_file(self, filepath):
-        parent = self.tree.insert("", "end",
-                                  text=os.path.basename(filepath),
-                                  open=True)
-
-        for algo, value in calculate_hashes(filepath).items():
-            self.tree.insert(
-                parent,
-                "end",
-                text="",
-                values=(algo, value, " COPY "),
-                tags=("copy_btn",)
-            )
+        for path in self.tk.splitlist(event.data):
+            if os.path.isdir(path):
+                job_id = self.scheduler.submit_tree(path)
+                name = os.path.basename(os.path.normpath(path)) or path
+                status = "Scanning..."
+            elif os.path.isfile(path):
+                job_id = self.scheduler.submit(path)
+                name = os.path.basename(path)
+                status = STATUS_TEXT["queued"]
+            else:
+                continue
+            row = self.tree.insert("", "end",
+                                   text=name,
+                                   values=("", status, " CANCEL "),
+                                   tags=("cancel_btn",),
+                                   open=True)
+            self.rows[job_id] = row
+            self.jobs[row] = job_id
+            if os.path.isdir(path):
+                walk = {"root": path, "row": row, "found": None, "done": 0, "failed": 0,
+                        "cancelled": 0, "dirs": {}, "dirty": set()}
+                self.walks[job_id] = walk
+                self.walk_rows[row] = walk
+
+    def _poll(self):
+        # Worker results reach the tree only here, on the Tk thread, a time-boxed batch at a time
+        deadline = time.perf_counter() + POLL_BUDGET
+        walks = set()
+        while time.perf_counter() < deadline:
+            try:
+                state, job, value = self.scheduler.events.get_nowait()
+            except queue.Empty:
+                break
+            if state == "walked":
+                self.walks[job.id]["found"] = value
+                walks.add(job.id)
+            elif job.walk is not None:
+                self._apply_walk_file(state, job, value)
+                walks.add(job.walk.id)
+            else:
+                self._apply(state, job, value)
+        for walk_id in walks:
+            self._refresh_walk(walk_id)
+
+        counts = self.scheduler.snapshot()
+        text = f"Queued {counts['queued']}   Running {counts['running']}   Done {counts['done']}"
+        for state in ("failed", "cancelled"):
+            if counts[state]:
+                text += f"   {state.capitalize()} {counts[state]}"
+        self.status.configure(text=text)
+        self.after(POLL_INTERVAL, self._poll)
+
+    def _apply(self, state, job, value):
+        row = self.rows.get(job.id)
+        if row is None:
+            return
+        if state == "running":
+            self.tree.item(row, values=("", STATUS_TEXT["running"], " CANCEL "))
+            return
+
+        del self.rows[job.id]
+        del self.jobs[row]
+        self.tree.item(row, values=("", "", ""), tags=())
+        self._show_result(row, state, value)
+
+    def _show_result(self, row, state, value):
+        if state == "done":
+            for algo, digest in value.items():
+                self.tree.insert(
+                    row,
+                    "end",
+                    text="",
+                    values=(algo, digest, " COPY "),
+                    tags=("copy_btn",)
+                )
+        else:
+            status = STATUS_TEXT[state] + (f": {value}" if value else "")
+            self.tree.item(row, values=("", status, ""))
+
+    def _apply_walk_file(self, state, job, value):
+        walk = self.walks[job.walk.id]
+        if state == "running":
+            return
+        walk[state] += 1
+        if state == "cancelled":
+            return
+
+        # One collapsed row per directory, created when its first file is done; the
+        # results stay in the rollup and get rows only while the directory is expanded
+        directory = os.path.dirname(job.path)
+        rollup = walk["dirs"].get(directory)
+        if rollup is None:
+            row = self.tree.insert(walk["row"], "end",
+                                   text=os.path.relpath(directory, walk["root"]),
+                                   values=("", "", ""))
+            # Placeholder child, so the row shows an expand arrow
+            self.tree.insert(row, "end", text="", values=("", "", ""))
+            rollup = walk["dirs"][directory] = {"row": row, "done": 0, "failed": 0, "files": [],
+                                                "shown": 0, "open": False, "filling": False}
+            self.dir_rows[row] = rollup
+        rollup[state] += 1
+        digests = tuple(value[algo] for algo in ALGORITHMS) if state == "done" else value
+        rollup["files"].append((job.path, state, digests))
+        walk["dirty"].add(directory)
+        if rollup["open"] and not rollup["filling"]:
+            rollup["filling"] = True
+            self.after_idle(self._fill_directory, rollup)
+
+    def _on_open(self, event):
+        rollup = self.dir_rows.get(self.tree.focus())
+        if rollup is None or rollup["open"]:
+            return
+        rollup["open"] = True
+        self.tree.delete(*self.tree.get_children(rollup["row"]))
+        if not rollup["filling"]:
+            rollup["filling"] = True
+            self._fill_directory(rollup)
+
+    def _on_close(self, event):
+        rollup = self.dir_rows.get(self.tree.focus())
+        if rollup is None or not rollup["open"]:
+            return
+        # Collapsing drops the file rows again, so the tree only holds what is expanded
+        rollup["open"] = False
+        rollup["shown"] = 0
+        self.tree.delete(*self.tree.get_children(rollup["row"]))
+        self.tree.insert(rollup["row"], "end", text="", values=("", "", ""))
+
+    def _fill_directory(self, rollup):
+        # Inserts an expanded directory's file rows FILL_BATCH at a time between events
+        if not rollup["open"]:
+            rollup["filling"] = False
+            return
+        start = rollup["shown"]
+        for path, state, value in rollup["files"][start:start + FILL_BATCH]:
+            row = self.tree.insert(rollup["row"], "end", text=os.path.basename(path), values=("", "", ""))
+            self._show_result(row, state, dict(zip(ALGORITHMS, value)) if state == "done" else value)
+            rollup["shown"] += 1
+        if rollup["shown"] < len(rollup["files"]):
+            self.after(1, self._fill_directory, rollup)
+        else:
+            rollup["filling"] = False
+
+    def _refresh_walk(self, walk_id):
+        walk = self.walks[walk_id]
+        for directory in walk["dirty"]:
+            rollup = walk["dirs"][directory]
+            self.tree.item(rollup["row"], values=("", rollup_text(rollup), ""))
+        walk["dirty"].clear()
+
+        row = walk["row"]
+        finished = walk["done"] + walk["failed"] + walk["cancelled"]
+        if walk["found"] is None:
+            self.tree.item(row, values=("", f"Scanning... {finished} files hashed", " CANCEL "))
+        elif finished < walk["found"]:
+            self.tree.item(row, values=("", f"{finished} of {walk['found']} files hashed", " CANCEL "))
+        elif walk_id in self.rows:
+            # Done: the rollups stay for expanding and exporting
+            self.tree.item(row, values=("", rollup_text(walk), ""), tags=())
+            del self.rows[walk_id]
+            del self.jobs[row]
+
+    def _cancel(self, job_id):
+        # Queued jobs are cancelled on the spot without an event, so they are shown here
+        walks = set()
+        for job in self.scheduler.cancel(job_id):
+            if job.walk is not None:
+                self._apply_walk_file("cancelled", job, None)
+                walks.add(job.walk.id)
+            else:
+                self._apply("cancelled", job, None)
+        for walk_id in walks:
+            self._refresh_walk(walk_id)
+
+    def _export(self, rollups):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not path:
+            return
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["path", *ALGORITHMS, "error"])
+            for rollup in rollups:
+                for file_path, state, value in rollup["files"]:
+                    if state == "done":
+                        writer.writerow(result_row(file_path, value))
+                    else:
+                        writer.writerow(result_row(file_path, error=value or ""))
+        Toast(self, f"Exported to {os.path.basename(path)}")
 
     def _handle_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
@@ -163,21 +703,40 @@ class HashApp(TkinterDnD.Tk):
         row = self.tree.identify_row(event.y)
 
         if region == "cell" and column == "#3" and row:
-            value = self.tree.item(row, "values")[1]
-            self._copy(value)
+            if row in self.jobs:
+                self._cancel(self.jobs[row])
+            elif "copy_btn" in self.tree.item(row, "tags"):
+                value = self.tree.item(row, "values")[1]
+                self._copy(value)
 
     def _right_click_menu(self, event):
         row = self.tree.identify_row(event.y)
         if not row:
             return
 
-        parent = self.tree.parent(row) or row
+        # The file row, whether its own row or one of its hash rows was clicked
+        parent = self.tree.parent(row) if "copy_btn" in self.tree.item(row, "tags") else row
         hashes = {
             self.tree.item(c, "values")[0]: self.tree.item(c, "values")[1]
             for c in self.tree.get_children(parent)
         }
 
         self.menu.delete(0, "end")
+        if parent in self.jobs:
+            self.menu.add_command(
+                label="Cancel",
+                command=lambda job_id=self.jobs[parent]: self._cancel(job_id)
+            )
+        if parent in self.walk_rows:
+            self.menu.add_command(
+                label="Export CSV...",
+                command=lambda walk=self.walk_rows[parent]: self._export(walk["dirs"].values())
+            )
+        elif parent in self.dir_rows:
+            self.menu.add_command(
+                label="Export CSV...",
+                command=lambda rollup=self.dir_rows[parent]: self._export([rollup])
+            )
         for algo in ["MD5", "SHA1", "SHA256"]:
             if algo in hashes:
                 self.menu.add_command(
@@ -195,7 +754,64 @@ class HashApp(TkinterDnD.Tk):
         self.update()
         Toast(self, "Copied to clipboard")
 
+# ----------------- CLI -----------------
+
+def run_cli(paths, output=None, ssd_workers=SSD_WORKERS, hdd_workers=HDD_WORKERS):
+    """Hash files and directory trees, writing a CSV row per file as results arrive"""
+    scheduler = HashScheduler(ssd_workers, hdd_workers)
+    # Every file job ends in exactly one done/failed/cancelled event; a walk
+    # adds its files to the expected total when it posts "walked"
+    walks = expected = received = 0
+    for path in paths:
+        if os.path.isdir(path):
+            scheduler.submit_tree(path)
+            walks += 1
+        elif os.path.isfile(path):
+            scheduler.submit(path)
+            expected += 1
+        else:
+            print(f"Skipping {path}: not a file or directory", file=sys.stderr)
+
+    started = time.perf_counter()
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["path", *ALGORITHMS, "error"])
+        while walks or received < expected:
+            state, job, value = scheduler.events.get()
+            if state == "walked":
+                walks -= 1
+                expected += value
+                continue
+            if state != "running":
+                received += 1
+            if state == "done":
+                writer.writerow(result_row(job.path, [value[algo] for algo in ALGORITHMS]))
+            elif state == "failed":
+                writer.writerow(result_row(job.path, error=value))
+    finally:
+        if output:
+            out.close()
+
+    counts = scheduler.snapshot()
+    print(f"{rollup_text(counts)} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
 # ----------------- RUN -----------------
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Argonis Hash Calculator: opens the drag & drop window, or hashes the given paths"
+    )
+    parser.add_argument("paths", nargs="*",
+                        help="files or directories to hash as CSV (none: open the window)")
+    parser.add_argument("--output", help="write the CSV to this file instead of stdout")
+    parser.add_argument("--ssd-workers", type=int, default=SSD_WORKERS,
+                        help="files hashed at once per solid-state device")
+    parser.add_argument("--hdd-workers", type=int, default=HDD_WORKERS,
+                        help="files hashed at once per spinning disk")
+    args = parser.parse_args()
+
+    if args.paths:
+        sys.exit(run_cli(args.paths, args.output, args.ssd_workers, args.hdd_workers))
     HashApp().mainloop()